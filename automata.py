@@ -19,7 +19,12 @@ from __future__ import print_function
 from __future__ import division
 
 import array
+import ast
+import contextlib
+import copy
+import hashlib
 import logging
+import os
 import struct
 import sys
 import threading
@@ -29,6 +34,7 @@ import greenery.lego
 import greenery.fsm
 
 from . import misc
+from .dotdict import dotdict
 
 __author__                      = "Perry Kundert"
 __email__                       = "perry@hardconsulting.com"
@@ -57,9 +63,25 @@ type_unicode_array_symbol	= 'u'
 type_str_array_symbol		= 'c' if sys.version_info[0] < 3 else 'u'
 type_bytes_array_symbol		= 'c' if sys.version_info[0] < 3 else 'B'
 
+# The ordinal (0-255) of iterated bytes symbols; used to index compiled state transition tables
+type_bytes_ordinal		= ord if sys.version_info[0] < 3 else int
+
+# The iterated bytes symbol for an ordinal (0-255); the inverse of type_bytes_ordinal
+type_bytes_symbol		= chr if sys.version_info[0] < 3 else int
+
 # Various default data path contexts/extensions
 path_ext_input			= '.input'	# default destination input
 
+_intern				= intern if sys.version_info[0] < 3 else sys.intern
+
+def path_intern( path ):
+    """Intern a data artifact path (if possible), so that equal paths are usually the same object, and
+    dict lookups using them can succeed by identity."""
+    try:
+        return _intern( path )
+    except TypeError:
+        return path	# eg. a Python2 unicode
+
 # If a greenery.fsm (which generally has an alphabet of str symbols), and we
 # want to use it on a binary stream of those symbols, we need to encode the
 # symbols from the str to the corresponding binary symbol(s).  This will
@@ -228,7 +250,280 @@ class remembering( chaining ):
         if self.memory:
             assert self.memory.pop() == item
         super( remembering, self ).push( item )
-        
+
+
+class buffering( remembering ):
+    """A remembering iterator over bytes symbols, backed by a single bytearray and a read offset
+    instead of an iterator, a push-back list and a memory list.  Chained input (any bytes-like
+    object, or iterable of byte ordinals) is appended to the buffer; next, peek, push and forget are
+    simple index arithmetic.  Yields the same symbols as iterating the equivalent bytes (str in
+    Python2, int in Python3), and so is a drop-in replacement for a rememberable/chainable/peekable
+    source of bytes.
+
+    The .memory (consumed since the last forget) and .remaining (not yet consumed) regions are
+    available as memoryviews over the buffer, without copying.  As with any memoryview, they are
+    only valid until the next chain or forget.
+
+    Consumed input is discarded from the front of the buffer by forget, once it is worth the cost of
+    moving the remaining data.  Chaining a non-iterable (eg. None) terminates any consumer with a
+    TypeError, once the buffered input is exhausted."""
+    compact			= 4096	# forget discards consumed input, once at least this much
+
+    def __init__( self, iterable=None ):
+        self._buf		= bytearray()
+        self._pos		= 0	# read offset of the next symbol in _buf
+        self._mark		= 0	# offset of the start of memory (the last forget)
+        self._base		= 0	# symbols sent (net) before the start of _buf
+        self._term		= None	# (<non-iterable>,) if chained to terminate input
+        if iterable is not None:
+            self.chain( iterable )
+
+    @property
+    def sent( self ):
+        return self._base + self._pos
+
+    @property
+    def memory( self ):
+        return memoryview( self._buf )[self._mark:self._pos]
+
+    @property
+    def remaining( self ):
+        return memoryview( self._buf )[self._pos:]
+
+    @property
+    def buffer( self ):
+        """The bytearray holding the buffered input; only valid until the next chain or forget."""
+        return self._buf
+
+    @property
+    def offset( self ):
+        """The index in buffer of the next symbol."""
+        return self._pos
+
+    def _replace( self, start, stop, data ):
+        """Replace _buf[start:stop] with data.  If a memoryview over the buffer is still held, the
+        bytearray cannot be resized; switch to a new copy instead (leaving the old one to the view)."""
+        try:
+            self._buf[start:stop] = data
+        except BufferError:
+            self._buf		= self._buf[:start] + bytearray( data ) + self._buf[stop:]
+
+    def chain( self, iterable ):
+        if self._term is not None:
+            return
+        try:
+            data		= iterable if isinstance( iterable, (bytes, bytearray, memoryview) ) \
+                                  else bytearray( iterable )
+        except TypeError:
+            if hasattr( iterable, '__iter__' ):
+                raise			# An iterable, but not of bytes symbols
+            self._term		= ( iterable, ) # A non-iterable; iter( self._term[0] ) raises TypeError
+            return
+        end			= len( self._buf )
+        self._replace( end, end, data )
+
+    def forget( self ):
+        self._mark		= self._pos
+        if self._pos >= self.compact or self._pos == len( self._buf ):
+            self._replace( 0, self._pos, b'' )
+            self._base	       += self._pos
+            self._pos = self._mark	= 0
+
+    def push( self, item ):
+        """Push back the last symbol; it'd better be consistent with our memory!  If there is no
+        memory, the symbol is inserted at the front of the buffer."""
+        if self._pos > self._mark:
+            assert type_bytes_symbol( self._buf[self._pos-1] ) == item
+            self._pos	       -= 1
+        elif self._pos > 0:
+            self._pos	       -= 1
+            self._buf[self._pos]= type_bytes_ordinal( item )
+            self._mark		= self._pos
+        else:
+            self._replace( 0, 0, bytearray( [ type_bytes_ordinal( item ) ] ))
+            self._base	       -= 1
+
+    def take( self, count ):
+        """Consume up to count symbols at once, returning them as a memoryview over the buffer (only
+        valid until the next chain or forget)."""
+        pos			= self._pos
+        self._pos		= min( pos + count, len( self._buf ))
+        return memoryview( self._buf )[pos:self._pos]
+
+    def peek( self ):
+        """Returns the next item (if any), otherwise None."""
+        if self._pos < len( self._buf ):
+            return type_bytes_symbol( self._buf[self._pos] )
+        if self._term is not None:
+            iter( self._term[0] )
+        return None
+
+    def __next__( self ):
+        pos			= self._pos
+        if pos < len( self._buf ):
+            self._pos		= pos + 1
+            return type_bytes_symbol( self._buf[pos] )
+        if self._term is not None:
+            iter( self._term[0] )
+        raise StopIteration
+
+
+#
+# trace
+# tracing
+# trace_log
+#
+#     Diagnostic events produced by the state machinery.  The hot paths of the state machinery check
+# the single module-level 'trace' hook; it is None (and costs nothing more than the check) unless
+# some tracing has been enabled via tracing( <hook>[, machine=<dfa>] ).  A hook is invoked as:
+#
+#     hook( event, machine=<dfa>, state=<state>, **kwds )
+#
+# where the event is a short str (eg. 'struct', 'decide', 'limit', ...), and the keywords carry
+# the structured details of the event (eg. path, value, sent, target).  Supply trace_log as the
+# hook, to log all events.
+#
+trace				= None	# None, or _trace_dispatch when any tracing is enabled
+_trace_hooks			= {}	# { id( <dfa> )/None (all): <hook> }
+
+
+def _trace_dispatch( event, machine=None, state=None, **kwds ):
+    """Deliver an event to the hook for the machine in which it occurs, or to the hook for all."""
+    hook			= _trace_hooks.get( id( machine ))
+    if hook is None:
+        hook			= _trace_hooks.get( None )
+    if hook is not None:
+        hook( event, machine=machine, state=state, **kwds )
+
+
+def tracing( hook, machine=None ):
+    """Enable (or disable, if hook is None) the delivery of trace events to hook.  If a machine is
+    supplied, only the events occurring within it (and any of its sub-machines) are delivered;
+    otherwise, all events not traced by a specific machine's hook are."""
+    global trace
+    keys			= [ None ]
+    if machine is not None:
+        keys			= []
+        stack			= [ machine ]
+        while stack:
+            mch			= stack.pop()
+            if id( mch ) in keys:
+                continue
+            keys.append( id( mch ))
+            if isinstance( mch, dfa_base ):
+                stack.extend( sta for sta in mch.initial.nodes() if isinstance( sta, dfa_base ))
+    for key in keys:
+        if hook is None:
+            _trace_hooks.pop( key, None )
+        else:
+            _trace_hooks[key]	= hook
+    trace			= _trace_dispatch if _trace_hooks else None
+
+
+def trace_log( event, machine=None, state=None, **kwds ):
+    """A trace hook that logs every event (at level INFO)."""
+    log.info( "%s %-10.10s %s", ( machine or state ).name_centered() if ( machine or state ) else '',
+              event, ', '.join( "%s=%r" % ( k, kwds[k] ) for k in sorted( kwds )))
+
+
+#
+# profiler
+#
+#     Opt-in accounting of the activity of each state (including sub-machines, and the states of
+# their sub-machines).  Like trace, the single module-level 'profiling' is None unless a profiler
+# is enabled, so costs nothing more than a check when not in use.
+#
+profiling			= None	# None, or the enabled profiler
+
+
+class profiler( object ):
+    """Accumulates, for each state run while enabled:
+
+        entries		-- Number of times the state was entered (ran)
+        symbols		-- Number of input symbols consumed (net), including by any sub-machine
+        epsilons	-- Number of no-input (None) transitions taken out of the state
+        stalls		-- Number of non-transitions (machine,None) yielded, awaiting input
+        seconds		-- Cumulative wall time from entry to termination, including sub-machines,
+                           and any time spent by the caller processing the yielded transitions
+
+    Enable while running the machine(s) of interest:
+
+        with automata.profiler() as prof:
+            ...
+        print( prof.dump( machine ))
+
+    The table of counters for a state machine (and all its sub-machines) is available via table,
+    in the same order as its nodes(), and dump formats it for display.
+
+    """
+    fields			= ( 'entries', 'symbols', 'epsilons', 'stalls', 'seconds' )
+
+    def __init__( self ):
+        self.stats		= {}	# { id( <state> ): (<state>, { <field>: <value>, ... }) }
+        self.previous		= None
+
+    def __enter__( self ):
+        global profiling
+        self.previous		= profiling
+        profiling		= self
+        return self
+
+    def __exit__( self, typ, val, tbk ):
+        global profiling
+        profiling		= self.previous
+        return False # suppress no exceptions
+
+    def counters( self, sta ):
+        """Returns the (new, if necessary) dict of counters for the state."""
+        try:
+            return self.stats[id( sta )][1]
+        except KeyError:
+            cnt			= dict( (f,0) for f in self.fields )
+            self.stats[id( sta )]= (sta,cnt)
+            return cnt
+
+    def run( self, sta, source, machine=None, path=None, data=None, ending=None ):
+        """Run the state's transition generator, accounting its activity."""
+        source			= peekable( source )
+        cnt			= self.counters( sta )
+        cnt['entries']	       += 1
+        sent			= source.sent
+        beg			= misc.timer()
+        try:
+            for which,target in sta._run( source=source, machine=machine, path=path, data=data,
+                                          ending=ending ):
+                if target is None and which is machine:
+                    cnt['stalls']      += 1
+                yield which,target
+        finally:
+            cnt['symbols']     += source.sent - sent
+            cnt['seconds']     += misc.timer() - beg
+
+    def table( self, machine=None ):
+        """Returns a list of (<state>, { <field>: <value>, ...}) for every state of the machine (and its
+        sub-machines, depth first) which has been run, or for all states run, if no machine given."""
+        if machine is None:
+            return list( self.stats.values() )
+        result			= []
+        seen			= set()
+        def walk( sta ):
+            for node in sta.nodes( seen=seen ):
+                if id( node ) in self.stats:
+                    result.append( self.stats[id( node )] )
+                if isinstance( node, dfa_base ):
+                    walk( node.initial )
+        walk( machine )
+        return result
+
+    def dump( self, machine=None ):
+        """Format the table of counters, one row per state."""
+        rows			= [ "%-40s %10s %10s %10s %10s %12s" % (( "state", ) + self.fields ) ]
+        for sta,cnt in self.table( machine ):
+            rows.append( "%-40.40s %10d %10d %10d %10d %12.6f" % (
+                sta._name, cnt['entries'], cnt['symbols'], cnt['epsilons'], cnt['stalls'],
+                cnt['seconds'] ))
+        return '\n'.join( rows )
+
 
 class decide( object ):
     """A type of object that may be supplied as a state transition target, instead of a state.  It must
@@ -259,7 +554,45 @@ class decide( object ):
 
     def execute( self, truth, machine=None, source=None, path=None, data=None ):
         target			= self.state if truth else None
-        log.info( "%s %-13.13s -> %10s w/ data: %r", machine.name_centered(), self, target, data )
+        if trace is not None:
+            trace( 'decide', machine=machine, state=self, path=path, target=target )
+        return target
+
+
+class switch( decide ):
+    """A decide that selects its target state from the cases dict, by the value of a single
+    discriminant found at the (relative) path in the data artifact, or produced by the supplied
+    value callable (with the same arguments as a predicate).  If no case matches, selects the default
+    .state (if any).  Unlike a sequence of decides (each re-evaluating the discriminant), the cost is
+    independent of the number of cases:
+
+        sel[None]	= switch( 'type', path='.type', cases={ 0x00c3: int_, 0x00c4: dint }, default=None )
+    """
+    def __init__( self, name, path=None, cases=None, default=None, value=None ):
+        super( switch, self ).__init__( name, state=default )
+        assert ( path is None ) != ( value is None ), "Must supply either a discriminant path or value"
+        self.path		= path
+        self.value		= value
+        self.cases		= dict( cases or {} )
+        self.paths		= {}	# { <path>: <path>+<discriminant path> }
+
+    def __str__( self ):
+        return "%s?{%s}" % ( self.name, ', '.join( "%r: %s" % ( k, v ) for k,v in sorted(
+            self.cases.items(), key=lambda tup: misc.natural( tup[0] ))) + (
+                ", *: %s" % ( self.state, ) if self.state is not None else "" ))
+
+    def __call__( self, machine=None, source=None, path=None, data=None ):
+        if self.value is None:
+            try:
+                key		= data.get( self.paths[path] )
+            except KeyError:
+                key		= data.get( self.paths.setdefault(
+                    path, path_intern( ( path or '' ) + self.path )))
+        else:
+            key			= self.value( machine=machine, source=source, path=path, data=data )
+        target			= self.cases.get( key, self.state )
+        if trace is not None:
+            trace( 'decide', machine=machine, state=self, path=path, value=key, target=target )
         return target
 
 
@@ -268,6 +601,15 @@ class NonTerminal( Exception ):
     pass
 
 
+class NotGenerable( Exception ):
+    """A state machine's graph contains a state with no generated equivalent (see generate)"""
+    pass
+
+
+# Marks a compiled transition table entry for which no transition exists (None is a valid target)
+_no_target			= object()
+
+
 class state( dict ):
     """The foundation state class.
 
@@ -307,7 +649,14 @@ class state( dict ):
     machine from consuming more input than it should.  The ending symbol is computed after this
     state processes its input symbol (if any).  The incoming symbol source iterator's .sent property
     is tested before transitioning, and transitioning is terminated if the computed ending symbol
-    has been reached."""
+    has been reached.
+
+    Once a state machine's graph is complete, its transitions may be frozen by compile(), into a
+    table indexed directly by byte symbol.  Any subsequent change to the state's transitions
+    discards the compiled table."""
+    _table			= None	# Compiled transitions for each byte symbol (see compile)
+    _epsilon			= _no_target # Compiled transition on no input (None)
+
     def __init__( self, name, terminal=False, alphabet=None, context=None, extension=None,
                   encoder=None, typecode=None, greedy=True, limit=None ):
         if isinstance( name, state ):
@@ -367,6 +716,26 @@ class state( dict ):
         """Confirm that the instance is safe to mutate."""
         pass
 
+    # Support cloning of an entire state machine graph, eg. to create independent instances of a
+    # machine (and all its sub-machines) for use by multiple threads simultaneously.
+    _shared			= ()	# Attributes shared by clones, rather than deep-copied (each class' own)
+
+    def __deepcopy__( self, memo ):
+        memo.setdefault( id( _no_target ), _no_target )
+        dup			= self.__class__.__new__( self.__class__ )
+        memo[id( self )]	= dup
+        shared			= set( a for c in self.__class__.__mro__ for a in c.__dict__.get( '_shared', () ))
+        for key,val in self.__dict__.items():
+            dup.__dict__[key]	= val if key in shared else copy.deepcopy( val, memo )
+        for key,val in dict.items( self ):
+            dict.__setitem__( dup, key, copy.deepcopy( val, memo ))
+        return dup
+
+    def clone( self ):
+        """Returns an independent copy of this state, and the entire graph of states (and
+        sub-machines) reachable from it.  Any compiled transitions remain compiled."""
+        return copy.deepcopy( self )
+
     # Support alternative representations in derived classes
     @property
     def name( self ):
@@ -404,6 +773,9 @@ class state( dict ):
     def extension( self ):
         return self._extension or '' 
 
+    _contexts			= None	# { <extension>: { <path>: <context> }}, computed by context
+    contexts_limit		= 256	# Discard the computed contexts for an extension, beyond this
+
     def context( self, path=None, extension=None ):
         """Yields: 
         Returns the state's data context, optionally joined with the specified path and
@@ -415,12 +787,24 @@ class state( dict ):
             >>> "a.b.boo_"
 
         Any path and context are joined with '.', and an extension is just added
-        to the base path plus any context."""
+        to the base path plus any context.  The (interned) result is computed once for each path
+        and extension."""
+        try:
+            return self._contexts[extension][path]
+        except (TypeError, KeyError):
+            pass
         pre			= path or ''
         add			= self._context or ''
         dot			= '.' if ( pre and add ) else ''
         ext			= extension if extension is not None else self.extension
-        return pre + dot + add + ext
+        result			= path_intern( pre + dot + add + ext )
+        if self._contexts is None:
+            self._contexts	= {}
+        cache			= self._contexts.setdefault( extension, {} )
+        if len( cache ) >= self.contexts_limit:
+            cache.clear()
+        cache[path]		= result
+        return result
 
     # 
     # [x] = <state>	-- Store an outgoing "edge" (input symbol 'x' and target <state>)
@@ -441,6 +825,7 @@ class state( dict ):
         recognizer predicate, or the simple input-->state mapping."""
         if not isinstance( target, state ) and target is not None and not hasattr( target, '__call__' ):
             raise KeyError( "Target must be a state, None, or a state decision function" )
+        self._table		= None	# Any compiled transitions are now invalid
         if hasattr( inp, '__call__' ):
             #log.debug( "%s   [%-10.10r] == %-10s (via %r)", self.name_centered(),
             #           "*", target, inp )
@@ -469,7 +854,31 @@ class state( dict ):
         a valid target.
 
         This usually returns a <state>, but may return a list: <decide>, ..., <decide>[, <state>]
+
+        If compiled, the outcome of all of the above for any byte symbol (or None) is found with a
+        single index; any other symbol falls thru to the full lookup.
         """
+        table			= self._table
+        if table is None:
+            return self._lookup( inp )
+        if inp is None:
+            target		= self._epsilon
+        elif type( inp ) is type_bytes_iter:
+            try:
+                idx		= type_bytes_ordinal( inp )
+            except TypeError:
+                return self._lookup( inp )
+            if not 0 <= idx < 256:
+                return self._lookup( inp )
+            target		= table[idx]
+        else:
+            return self._lookup( inp )
+        if target is _no_target:
+            raise KeyError( inp )
+        return target
+
+    def _lookup( self, inp ):
+        """The full (uncompiled) transition lookup; raises KeyError if no transition found."""
         enc			= self.encode( inp )
         try:
             target		= super( state, self ).__getitem__( enc )
@@ -507,6 +916,61 @@ class state( dict ):
         except KeyError:
             return default
 
+    def compilable( self ):
+        """A state's transitions may be compiled into a byte symbol table iff it has no encoder, and all
+        of its explicit input symbols are single byte symbols.  Recognizers must be pure predicates
+        on the symbol; if any fails on a byte symbol, the state isn't compilable."""
+        if self.encoder is not None:
+            return False
+        for key in self.keys():
+            if key is None or key is True:
+                continue
+            if type( key ) is not type_bytes_iter:
+                return False
+            try:
+                if not 0 <= type_bytes_ordinal( key ) < 256:
+                    return False
+            except TypeError:
+                return False
+        return True
+
+    def compile( self, seen=None ):
+        """Freeze this state's transitions into a flat table of 256 precomputed targets (one for each
+        byte symbol, each resolving any exact symbol, recognizer, wildcard True and epsilon None
+        transition in the usual order), plus the precomputed epsilon target.  Thereafter, dispatch
+        on a byte symbol is a single index.  Returns the number of states compiled.
+
+        Must only be done once the state's transitions are complete; any later change to the
+        transitions discards the compiled table (and the full lookup is again used).
+
+        """
+        if seen is None:
+            seen		= set()
+        if id( self ) in seen:
+            return 0
+        seen.add( id( self ))
+        self._table		= None
+        if not self.compilable():
+            return 0
+        table			= []
+        try:
+            for idx in range( 256 ):
+                sym		= chr( idx ) if type_bytes_iter is str else idx
+                try:
+                    table.append( self._lookup( sym ))
+                except KeyError:
+                    table.append( _no_target )
+        except Exception as exc:
+            if log.isEnabledFor( logging.DEBUG ):
+                log.debug( "%s -- not compilable; recognizer failed: %r", self.name_centered(), exc )
+            return 0
+        try:
+            self._epsilon	= self._lookup( None )
+        except KeyError:
+            self._epsilon	= _no_target
+        self._table		= table
+        return 1
+
     # Input symbol validation and processing
     def validate( self, inp ):
         """Test input for validity to process.  The base implementation support Null (no-input) by
@@ -548,7 +1012,7 @@ class state( dict ):
 
     # State transition machinery
     def run( self, source, machine=None, path=None, data=None, ending=None ):
-        """A generator which will attempt to process input in the present state; if not acceptable
+        """Returns a generator which will attempt to process input in the present state; if not acceptable
         (self.accepts/self.validate returns False), yields non-transition event, and then tries
         again to process an acceptable input.
 
@@ -599,7 +1063,15 @@ class state( dict ):
 
           NonTerminal	-- if sub-machine terminates in a non-terminal state
 
+        If a profiler is enabled, the generator's activity is accounted to this state.
         """
+        if profiling is not None:
+            return profiling.run( self, source=source, machine=machine, path=path, data=data,
+                                  ending=ending )
+        return self._run( source=source, machine=machine, path=path, data=data, ending=ending )
+
+    def _run( self, source, machine=None, path=None, data=None, ending=None ):
+        """The state transition generator; see run."""
         self.safe()
 
         # Convert the source into something that all delegated generators can consume from and push
@@ -613,12 +1085,11 @@ class state( dict ):
         # sent, we must fail; it is unacceptable to transition into a state and then not process
         # input (use other means to force stoppage before entry, such as input limits or a None
         # transition)
-        seen			= set()
+        crumb			= None
         while not self.accepts( source=source, machine=machine, path=path, data=data ):
-            crumb		= (None,source.peek(),source.sent)
-            assert crumb not in seen, \
+            last,crumb		= crumb,(source.peek(),source.sent)
+            assert crumb != last, \
                 "%s detected no progress before finding acceptable symbol" % ( self )
-            seen.add( crumb )
             yield machine,None
 
         self.process( source=source, machine=machine, path=path, data=data )
@@ -644,8 +1115,9 @@ class state( dict ):
                 assert isinstance( limit, int ), \
                     "Supplied limit=%r (== %r) must be (or reference) an int, not a %s" % (
                         limit_src, limit, type( limit ))
-                log.info( "%s -- limit=%r == %r; ending at symbol %r vs. %r", self.name_centered(),
-                          limit_src, limit, source.sent + limit, ending )
+                if trace is not None:
+                    trace( 'limit', machine=machine, state=self, path=limit_src, value=limit,
+                           sent=source.sent, ending=ending )
                 if ending is None or source.sent + limit < ending:
                     ending	= source.sent + limit 
 
@@ -661,11 +1133,9 @@ class state( dict ):
             # a terminal state, to allow normal termination activities to complete just as if a
             # StopIteration had occurred.
             if not self.terminal:
-                log.debug( "%s -- early termination in non-terminal state", self.name_centered() )
                 exception	= exc
-            else:
-                log.info( "%s -- early termination in terminal state; masking GeneratorExit",
-                          self.name_centered() )
+            if trace is not None:
+                trace( 'closed', machine=machine, state=self, terminal=self.terminal )
             raise
         except Exception as exc:
             # Trap other random Exceptions.  Any Exception will prevent us from processing our own
@@ -687,13 +1157,16 @@ class state( dict ):
         # we've met it.  We can't decide that here, because we actually want to keep taking None
         # transitions 'til we find a terminal state, even if we've run out of input symbols.  So,
         # pass it down to transition.
-        seen			= set()
+        # transition yields 0+ non-transitions, and then at most 1 transition; so, no progress is
+        # only possible via consecutive identical non-transitions.
+        last_sent = last_peek	= None
         for which,state in self.transition(
                 source=source, machine=machine, path=path, data=data, ending=ending ):
-            crumb		= (state,source.peek(),source.sent)
-            if crumb in seen:
-                break
-            seen.add( crumb )
+            if state is None:
+                sent,peek	= source.sent,source.peek()
+                if sent == last_sent and peek == last_peek:
+                    break
+                last_sent,last_peek = sent,peek
             yield which,state
 
         if ending is not None:
@@ -751,7 +1224,8 @@ class state( dict ):
                 # there is *any* possibility that a transition might be possible if input *were*
                 # available, we need to yield a non-transition.
                 if limited:
-                    log.debug( "%s -- stopped due to reaching symbol limit %d", self.name_centered(), ending )
+                    if trace is not None:
+                        trace( 'limited', machine=machine, state=self, sent=source.sent, ending=ending )
                 elif inp is None and not limited and (
                         self.recognizers or not all( k is None for k in self.keys() )):
                     #log.info( "%s <non  trans>", self.name_centered() )
@@ -759,6 +1233,9 @@ class state( dict ):
                     continue
                 break					# No other transition possible; done
 
+            if inp is None and profiling is not None:
+                profiling.counters( self )['epsilons'] += 1
+
             # Found the transition or choice list (could be a state, a decide or decide, ...,
             # decide[, state]). Evaluate each target state/decide instance, 'til we find a
             # state/None.  Even decides could end up yielding None, if all decide evaluate to None,
@@ -793,7 +1270,8 @@ class state( dict ):
 
     def initialize( self, machine=None, path=None, data=None ):
         """Done once at state entry."""
-        log.debug( "%s -- initialized", self.name_centered() )
+        if trace is not None:
+            trace( 'initialize', machine=machine, state=self, path=path )
 
     def terminate( self, exception, machine=None, path=None, data=None ):
         """Invoked on termination (after yielding our final state transition).  Exception could be:
@@ -828,12 +1306,14 @@ class state( dict ):
                     # None is a valid state/decide target; skip
                     if target is None:
                         continue
-                    if not isinstance( target, state ):	# Only state and *.state types allowed
-                        target	= target.state
+                    # Only state and *.state types allowed; a switch may select any of its .cases
+                    targets	= [ target ] if isinstance( target, state ) else (
+                        [ target.state ] + list( getattr( target, 'cases', {} ).values() ))
+                    for target in targets:
                         if target is None:
                             continue
-                    for output in target.nodes( seen=seen ):
-                        yield output
+                        for output in target.nodes( seen=seen ):
+                            yield output
 
     def edges( self ):
         """Generate (input,state|decide) tuples for all outgoing edges."""
@@ -846,6 +1326,14 @@ class state( dict ):
             else:
                 yield (inp,target)
 
+    # Generation of specialized Python source (see generator)
+    def generate( self, gen, path=None ):
+        """Emit the Python source equivalent to entering this state into the generator.  The base state
+        (a Null state, with no processing) emits nothing; any other state must implement its own."""
+        if self.limit is not None or not gen.plain( self ):
+            raise NotGenerable( "%s: no generated equivalent of %s" % (
+                self.name_centered(), self.__class__.__name__ ))
+
     # Support for producing state machinery from a regular expression specification
     @classmethod
     def from_regex( cls, machine, encoder=None, **kwds ):
@@ -995,6 +1483,25 @@ class state( dict ):
         return (regexstr, regex, machine, state( states[machine.initial] ))
 
 
+    @classmethod
+    def from_regex_cached( cls, machine, encoder=None, **kwds ):
+        """As from_regex, but rebuilds the graph of states from the memoized transition table of a
+        regex (see regex_table), avoiding greenery.  Returns the regex string and initial state:
+
+            ('regex', <state>)
+        """
+        table			= regex_table( cls, machine, encoder=encoder, **kwds )
+        if table is None:
+            regexstr,_,_,initial= cls.from_regex( machine, encoder=encoder, **kwds )
+            return regexstr, initial
+        regexstr,rows		= table
+        nodes			= [ cls( name, terminal=terminal, **kwds ) for name,terminal,_ in rows ]
+        for node,(_,_,edges) in zip( nodes, rows ):
+            for sym,dst in edges:
+                node[sym]	= None if dst is None else nodes[dst]
+        return regexstr, state( nodes[0] )
+
+
 class state_input( state ):
     """A state that consumes and saves its input symbol by appending it to the specified
     <path>.<context><extension> index/attribute in the supplied data artifact.  Creates an
@@ -1028,6 +1535,8 @@ class state_input( state ):
             except KeyError:
                 thing = data[path] = array.array( self.typecode )
             thing.append( inp )
+            if trace is not None:
+                trace( 'input', machine=machine, state=self, path=path, value=inp, sent=source.sent )
             #log.info( "%s :  %-10.10r => %20s[%3d]=%r", ( machine or self ).name_centered(),
             #           inp, path, len(data[path])-1, inp )
 
@@ -1036,7 +1545,8 @@ class state_drop( state_input ):
     """Validate and drop a symbol."""
     def process( self, source, machine=None, path=None, data=None ):
         inp			= next( source )
-        log.debug( "%s :  %-10.10r: dropped", ( machine or self ).name_centered(), inp )
+        if trace is not None:
+            trace( 'drop', machine=machine, state=self, value=inp, sent=source.sent )
 
 
 class state_struct( state ):
@@ -1058,6 +1568,7 @@ class state_struct( state ):
     """
     struct_format		= 'B'	# default: unsigned byte
     struct_calcsize		= struct.calcsize( struct_format )
+    _shared			= ( '_struct', ) # immutable, but not copyable
 
     def __init__( self, name, format=None, offset=0, index=0, input_extension=None, **kwds ):
         super( state_struct, self ).__init__( name, **kwds )
@@ -1069,6 +1580,7 @@ class state_struct( state ):
         assert self.struct_calcsize, "Cannot calculate size of format %r" % self.struct_format
         self._struct		= struct.Struct( self.struct_format )# eg '<H' (little-endian uint16)
         self._input		= input_extension if input_extension is not None else path_ext_input
+        self._input_ext	= self.extension + self._input # (extension of) the raw data
 
     def terminate( self, exception, machine=None, path=None, data=None ):
         """Decode a value from path.context_, and store it to path.context.  Will fail if insufficient
@@ -1086,19 +1598,16 @@ class state_struct( state ):
         siz			= self.struct_calcsize
         beg			= self.offset + self.index * siz
         end			= beg + siz
-        buf			= data[ours+self._input][beg:end]
+        buf			= data[self.context( path, self._input_ext )][beg:end]
         val		        = self._struct.unpack_from( buffer=buf )[0]
         try:
             data[ours].append( val )
-            log.info( "%s :  %-10.10s => %20s[%3d]= %r (format %r over %r)",
-                      ( machine or self ).name_centered(),
-                      "", ours, len(data[ours])-1, val, self._struct.format, buf )
         except (AttributeError, KeyError):
             # Target doesn't exist, or isn't a list/deque; just save value
             data[ours]		= val
-            log.info( "%s :  %-10.10s => %20s     = %r (format %r over %r)",
-                      ( machine or self ).name_centered(),
-                      "", ours, val, self._struct.format, buf )
+        if trace is not None:
+            trace( 'struct', machine=machine, state=self, path=ours, value=val,
+                   format=self._struct.format )
 
 
 class dfa_base( object ):
@@ -1119,7 +1628,18 @@ class dfa_base( object ):
     cycles (default: 1), performs its own transition for its own parent state machine.  Is only
     considered terminal when instantiated with terminal=True, and its sub-machine is terminal, and
     its final loop is complete.
+
+    To employ the same state machine in several threads simultaneously, use a dfa_pool to provide
+    independent clones of it.
+
+    If .quiet is set, the transitions of the sub-machine (and, recursively, of its sub-machines) are
+    consumed where they occur, instead of being yielded up through every enclosing machine; only
+    non-transitions (and the dfa's own transitions) are yielded.  Thus, the cost of each symbol does
+    not grow with the depth of nesting of the grammar.  Used by run_buffer.
     """
+    _shared			= ( 'lock', ) # replaced in clones
+    quiet			= False	# Surface the sub-machine's transitions (not just non-transitions)
+
     def __init__( self, name=None, initial=None, repeat=None, **kwds ):
         super( dfa_base, self ).__init__( name or self.__class__.__name__, **kwds )
         self.current		= initial
@@ -1144,6 +1664,12 @@ class dfa_base( object ):
         self.lock.release()
         return False # suppress no exceptions
 
+    def __deepcopy__( self, memo ):
+        """A clone is not in use by any state machine; it gets its own lock."""
+        dup			= super( dfa_base, self ).__deepcopy__( memo )
+        dup.lock		= threading.Lock()
+        return dup
+
     def safe( self ):
         """Ensure that the instance is locked before mutating."""
         assert self.lock.locked() is True, \
@@ -1163,10 +1689,55 @@ class dfa_base( object ):
         last loop, and the current state of our multi-state machine is also marked terminal."""
         return self._terminal and self.current.terminal and not self.loop()
 
+    def compile( self, seen=None ):
+        """Compile our own transitions, and those of every state in our sub-machine (and any of their
+        sub-machines), once the complete state machine is constructed.  Returns the number of states
+        compiled.  Any state later modified (eg. by registering additional transitions) simply
+        reverts to its uncompiled transitions."""
+        if seen is None:
+            seen		= set()
+        if id( self ) in seen:
+            return 0
+        count			= super( dfa_base, self ).compile( seen=seen )
+        for sta in self.initial.nodes():
+            count	       += sta.compile( seen=seen )
+        if log.isEnabledFor( logging.DEBUG ):
+            log.debug( "%s -- compiled %d states", self.name_centered(), count )
+        return count
+
+    def run_buffer( self, buffer=None, offset=0, source=None, path=None, data=None, ending=None ):
+        """Run the state machine over contiguous buffers of input (eg. bytes, bytearray, memoryview),
+        instead of surfacing every (machine,state) transition to the caller.  All transitions (at
+        every level of nesting) are consumed internally; the generator only yields a non-transition
+        (machine,None) when the available input is exhausted and the machine requires more.  The
+        next buffer may then be supplied via .send( <buffer> ), or chained onto the (optionally
+        provided) source.  The generator completes at the end of the frame (the machine has
+        terminated); any unconsumed input remains in source, for the next frame.
+
+        The initial buffer (if any) is consumed beginning at offset, without copying; a memoryview
+        slice is chained onto the source.  Since iterating a memoryview produces the same symbols
+        as iterating the corresponding bytes (str in Python2, int in Python3), the resultant symbols
+        are identical to those produced by run over the same input.
+
+        """
+        source			= chainable( source )
+        if buffer is not None:
+            source.chain( memoryview( buffer )[offset:] )
+        quiet,self.quiet	= self.quiet,True
+        try:
+            for which,state in self.run( source=source, path=path, data=data, ending=ending ):
+                # A non-transition with input still available is simply retried; the machine detects
+                # its own lack of progress.  Only when we run out of input, must we wait for more.
+                if state is None and source.peek() is None:
+                    buffer	= yield which,state
+                    if buffer is not None:
+                        source.chain( memoryview( buffer ))
+        finally:
+            self.quiet		= quiet
+
     def reset( self ):
         """Done at the start of each loop."""
         if self.current is not self.initial:
-            log.debug( "%s -- reset", self.name_centered() )
             self.current	= self.initial
 
     def loop( self ):
@@ -1205,7 +1776,8 @@ class dfa_base( object ):
                 # final is missing, no elements will be collected.
                 final_src	= self.context( path, final_src )
                 self.final	= data.get( final_src, 0 )
-                log.debug( "%s -- repeat=%r == %r", self.name_centered(), final_src, self.final )
+                if trace is not None:
+                    trace( 'repeat', machine=machine, state=self, path=final_src, value=self.final )
             assert isinstance( self.final, int ), \
                 "Supplied repeat=%r (== %r) must be (or reference) an int, not a %r" % (
                     self.repeat, final_src, self.final )
@@ -1215,18 +1787,27 @@ class dfa_base( object ):
         # not advance cycle; hence, self.terminal will remain False on any early exit (eg. due to an
         # early GeneratorExit by a client closing self.run's generator)
         stasis			= False
+        quiet			= self.quiet
         while self.loop() and not stasis:
             self.reset()
             self.cycle	       += 1 # On last cycle, sub-machine may be terminated at any terminal state
             #log.debug( "%s <sub  %s> %3d/%3d (from %s)", self.name_centered(), 
             #           "loop" if self.cycle < self.final else "last" , self.cycle, self.final, 
             #           repr( final_src ) if final_src is not None else "(default)" )
-            yield self,self.current
-
-            seen		= set( [(self.current,source.peek(),source.sent)] )
+            if not quiet:
+                yield self,self.current
+
+            # Detect loops in our sub-machine without progress.  Until the number of symbols sent
+            # exceeds its high-water mark, remember each (<state>,<symbol>,<#sent>); progress forgets
+            # them, so a set is only required while no symbols are being consumed.
+            seen		= None
+            progress		= source.sent
+            mark,mark_peek	= self.current,source.peek()
             done		= False
             while not done:
                 with self.current:
+                    if quiet is not getattr( self.current, 'quiet', quiet ):
+                        self.current.quiet = quiet # a (locked) sub-machine; consumes its transitions too
                     submach	= self.current.run(
                         source=source, machine=self, path=self.context( path ), data=data, ending=ending )
                     try:
@@ -1242,15 +1823,22 @@ class dfa_base( object ):
                                 # machine/state, with the same pending input, and the same number of
                                 # net symbols sent from our input stream, we are done.  We'd better
                                 # be in a terminal state!
-                                crumb	= (target,source.peek(),source.sent)
-                                stasis	= crumb in seen
-                                if stasis:
-                                    #log.debug( "%s <sub stasis>: done on %s", self.name_centered(),
-                                    #           reprlib.repr( crumb ))
-                                    done = True
-                                    yield which,target
-                                    break
-                                seen.add( crumb )
+                                sent	= source.sent
+                                if sent > progress:
+                                    progress,seen = sent,None
+                                    mark,mark_peek = target,source.peek()
+                                else:
+                                    crumb	= (target,source.peek(),sent)
+                                    if seen is None:
+                                        seen	= set( [(mark,mark_peek,progress)] )
+                                    stasis	= crumb in seen
+                                    if stasis:
+                                        #log.debug( "%s <sub stasis>: done on %s", self.name_centered(),
+                                        #           reprlib.repr( crumb ))
+                                        done = True
+                                        yield which,target
+                                        break
+                                    seen.add( crumb )
 
                             # A transition or None, and we haven't seen this exact combination
                             # of state and input before.
@@ -1259,6 +1847,11 @@ class dfa_base( object ):
                                 if target:
                                     self.current= target
                                     transit	= True
+                                    if trace is not None:
+                                        trace( 'transition', machine=self, state=target,
+                                               sent=source.sent )
+                                    if quiet:
+                                        continue # consumed here; not surfaced to enclosing machines
                             else:
                                 #log.debug( "%s <deep trans> on %s", self.name_centered(),
                                 #           which.name_centered() )
@@ -1301,6 +1894,14 @@ class dfa_base( object ):
 
         #log.debug( "%s <sub   term>", self.name_centered() )
 
+    def generate( self, gen, path=None ):
+        """Emit the sub-machine's (linear) graph, once for each repeat cycle."""
+        if self.limit is not None or not gen.plain( self ):
+            raise NotGenerable( "%s: no generated equivalent of %s" % (
+                self.name_centered(), self.__class__.__name__ ))
+        with gen.repeat( self, path=path ):
+            gen.chain( self.initial, path=self.context( path ))
+
 
 class dfa( dfa_base, state ):
     pass
@@ -1332,6 +1933,17 @@ class dfa_post( dfa_base, state ):
         self.post		= {}
         super( dfa_post, self ).__init__( *args, **kwds )
 
+    def __deepcopy__( self, memo ):
+        """A clone has no pending post-processing closures."""
+        dup			= super( dfa_post, self ).__deepcopy__( memo )
+        dup.post		= {}
+        return dup
+
+    def generate( self, gen, path=None ):
+        """Post-processing closures depend on running the machine itself; cannot be generated."""
+        raise NotGenerable( "%s: no generated equivalent of %s" % (
+            self.name_centered(), self.__class__.__name__ ))
+
     def post_process_closure( self, closure ):
         """Atomically append a closure to this Thread's list of pending."""
         self.post.setdefault( threading.current_thread().ident, [] ).append( closure )
@@ -1359,6 +1971,370 @@ class dfa_post( dfa_base, state ):
                                  repr( exc ), ''.join( traceback.format_exc() ))
 
 
+class dfa_pool( object ):
+    """Provides independent clones of a prototype state machine, so that several threads (or
+    sessions) may run the same machine simultaneously, instead of queueing on the prototype's lock.
+    Use exactly as the machine itself would be used:
+
+        with <dfa_pool> as machine:
+            for m,s in machine.run( ... ):
+                ...
+
+    Each with acquires an idle clone (or creates a new one), and locks it; on exit, the clone is
+    unlocked (performing any dfa_post post-processing) and returned to the pool.  Clones are created
+    on demand from the prototype; if the prototype is subsequently changed (eg. new transitions),
+    use clear to discard the existing clones.
+
+    """
+    def __init__( self, prototype ):
+        self.prototype		= prototype
+        self.idle		= []
+        self.generation		= 0	# Clones of prior generations are not returned to the pool
+        self.lock		= threading.Lock()
+        self.local		= threading.local()	# Each Thread's stack of machines in use
+
+    def clear( self ):
+        """Discard all clones; subsequently, clones will be made from the current prototype."""
+        with self.lock:
+            self.idle		= []
+            self.generation    += 1
+
+    def __enter__( self ):
+        with self.lock:
+            machine		= self.idle.pop() if self.idle else None
+            generation		= self.generation
+        if machine is None:
+            machine		= self.prototype.clone()
+        machine.__enter__()
+        self.local.__dict__.setdefault( 'used', [] ).append( (machine,generation) )
+        return machine
+
+    def __exit__( self, typ, val, tbk ):
+        machine,generation	= self.local.used.pop()
+        try:
+            return machine.__exit__( typ, val, tbk )
+        finally:
+            with self.lock:
+                if generation == self.generation:
+                    self.idle.append( machine )
+
+
+# 
+# generator	-- Collects specialized Python source for a linear state machine graph
+# generate	-- Returns a specialized Python function equivalent to a dfa
+# 
+#     Parsing a sentence with the state machinery walks the graph via a stack of nested generators,
+# processing one symbol at a time.  For grammars without any decisions (eg. fixed-layout protocol
+# headers, and length-prefixed payloads), the same results may be obtained by straight-line Python
+# code, with struct unpacking of fixed fields and explicit loops for repeats.  The state machine
+# remains the source of truth; each state emits its own equivalent source via its .generate method.
+# 
+class generator( object ):
+    """Collects the lines of Python source for a function parser( buf, data, offset=0, final=True ),
+    equivalent to running the linear graph of states supplied to chain.  Values (eg. struct.Struct
+    instances) required by the source are supplied in the function's namespace via constant."""
+    def __init__( self, name ):
+        self.name		= name
+        self.lines		= []
+        self.depth		= 1
+        self.loops		= 0	# Nesting of repeat loops
+        self.names		= 0	# Unique constant/local names
+        self.namespace		= {
+            'array':		array,
+            'NonTerminal':	NonTerminal,
+        }
+
+    def emit( self, line ):
+        self.lines.append( '    ' * self.depth + line )
+
+    def constant( self, value ):
+        """Make the value available to the generated source; returns its name."""
+        self.names	       += 1
+        name			= '_k%d' % self.names
+        self.namespace[name]	= value
+        return name
+
+    def local( self, prefix='_v' ):
+        """Returns a new, unique local variable name."""
+        self.names	       += 1
+        return '%s%d' % ( prefix, self.names )
+
+    @staticmethod
+    def plain( sta, base=None ):
+        """Determine if the state sta does no more processing than the base (default: state) class."""
+        base			= state if base is None else base
+        for method in ( 'initialize', 'process', 'terminate' ):
+            ours,theirs		= getattr( type( sta ), method ), getattr( base, method )
+            if getattr( ours, '__func__', ours ) is not getattr( theirs, '__func__', theirs ):
+                return False
+        return True
+
+    def need( self, size ):
+        """Ensure that at least size (an expression) symbols of input remain."""
+        self.emit( "if end - offset < %s:" % ( size ))
+        self.emit( "    raise NonTerminal( %r )" % ( "%s: insufficient input" % self.name ))
+
+    def count( self, machine, path=None ):
+        """Returns an expression for the machine's number of repeat cycles (default: 1)."""
+        if machine.repeat is None:
+            return '1'
+        if isinstance( machine.repeat, int ):
+            return '%d' % machine.repeat
+        count			= self.local( '_n' )
+        self.emit( "%s = data.get( %r, 0 )" % ( count, machine.context( path, machine.repeat )))
+        return count
+
+    @contextlib.contextmanager
+    def repeat( self, machine, path=None ):
+        """Emits the source within the context once for each of the machine's repeat cycles."""
+        count			= self.count( machine, path=path )
+        if count == '1':
+            yield
+            return
+        self.emit( "for _ in range( %s ):" % count )
+        self.depth	       += 1
+        self.loops	       += 1
+        try:
+            yield
+        finally:
+            self.depth	       -= 1
+            self.loops	       -= 1
+
+    def chain( self, initial, path=None ):
+        """Emit the source for each state in the (linear) graph from the initial state, 'til a state
+        with no outgoing transitions is reached.  A terminal state whose transition requires input
+        may end the sentence, if no more input is available (except within a repeat loop), but only
+        if the input is final; otherwise, the sentence may yet continue."""
+        sta,seen,nest		= initial,set(),0
+        while True:
+            if id( sta ) in seen:
+                raise NotGenerable( "%s: cannot generate a loop in the graph" % (
+                    sta.name_centered() ))
+            seen.add( id( sta ))
+            sta.generate( self, path=path )
+            targets		= list( sta.values() )
+            if ( sta.recognizers or any( key not in ( True, None ) for key in sta )
+                 or any( target is not targets[0] for target in targets )):
+                raise NotGenerable( "%s: cannot generate a decision in the graph" % (
+                    sta.name_centered() ))
+            if not targets:
+                if not sta._terminal:
+                    raise NotGenerable( "%s: cannot generate a non-terminal final state" % (
+                        sta.name_centered() ))
+                break
+            if not isinstance( targets[0], state ):
+                raise NotGenerable( "%s: cannot generate a decision in the graph" % (
+                    sta.name_centered() ))
+            if sta._terminal and None not in sta and not self.loops:
+                self.emit( "if offset == end and not final:" )
+                self.emit( "    raise NonTerminal( %r )" % ( "%s: sentence may continue" % self.name ))
+                self.emit( "if offset < end:" )
+                self.depth     += 1
+                nest	       += 1
+            sta			= targets[0]
+        self.depth	       -= nest
+
+    def function( self ):
+        """Compile the collected source, returning the function (with its source in .source)."""
+        source			= '\n'.join(
+            [ "def %s( buf, data, offset=0, final=True ):" % self.name,
+              "    end = len( buf )" ]
+            + self.lines
+            + [ "    return offset", "" ] )
+        namespace		= dict( self.namespace )
+        exec( compile( source, '<generated %s>' % self.name, 'exec' ), namespace )
+        function		= namespace[self.name]
+        function.source		= source
+        return function
+
+
+def generate( machine, path=None, name=None ):
+    """Returns a specialized Python function parser( buf, data, offset=0, final=True ) equivalent to
+    running the machine (with the given path) over the bytes (or bytearray) buf from offset, which
+    stores the same results into data, and returns the offset following the parsed sentence.  Raises
+    NonTerminal if buf contains only an incomplete sentence.  Unless final, buf is assumed to be
+    followed by further input, so a sentence which could continue beyond the end of buf is also
+    incomplete.  No trace or profiling events are produced.
+
+    Only machines whose graphs contain no decisions (eg. fixed-layout octets_fields, TYPE and octets
+    states, in a linear sequence) can be generated; otherwise, raises NotGenerable, and the
+    machine must be run normally."""
+    gen				= generator( name or 'parser' )
+    machine.generate( gen, path=path )
+    return gen.function()
+
+
+class parsing( object ):
+    """A resumable parse of a stream of frames (each a sentence of the machine), from input supplied
+    piecemeal to feed, which returns the data artifact of each frame completed.  Between calls, the
+    parse is held in explicit state: the buffered input, and (for a machine whose parser can be
+    generated) nothing more than the offset of the frame; otherwise, the suspended run of a private
+    clone of the machine.  Thus, an event loop or callback (eg. an asyncio Protocol's data_received)
+    can multiplex many partial parses, without locking a shared machine or dedicating a Thread to
+    each.
+
+    The frames produced are independent of how the input is divided between feeds.  A frame is
+    complete once the machine terminates (including when it can make no progress on the available
+    input, in a terminal state); a frame which could be continued by further input (eg. a greedy
+    sequence of digits) is held 'til that input arrives, or 'til finish indicates that there is none.
+
+        frames			= cpppo.parsing( enip.enip_machine() )
+        ...
+        for data in frames.feed( octets ):
+            ...
+        for data in frames.finish():	# at EOF
+            ...
+
+    """
+    def __init__( self, machine, path=None, generated=True ):
+        self.path		= path
+        self.source		= buffering()
+        self.parser		= None
+        if generated:
+            try:
+                self.parser	= generate( machine, path=path )
+            except NotGenerable:
+                pass
+        self.machine		= None
+        if not self.parser:
+            self.machine	= machine.clone()
+            self.machine.lock.acquire()	# A private clone; remains locked for our exclusive use
+            self.machine.quiet	= True
+        self.engine		= None	# The suspended run of the machine (if any),
+        self.data		= None	#   its data artifact,
+        self.start		= None	#   and the input symbols sent at its start
+
+    def feed( self, octets=None ):
+        """Buffer the supplied octets (if any), and return a list of the data of all frames completed."""
+        if octets:
+            self.source.chain( octets )
+        frames			= []
+        while self.source.peek() is not None:
+            data		= self.resume()
+            if data is None:
+                break
+            frames.append( data )
+        return frames
+
+    def finish( self ):
+        """No further input will be fed; return a list of the data of all remaining frames.  Raises
+        NonTerminal if the input ends within an incomplete frame."""
+        frames			= self.feed()
+        if self.source.peek() is not None or self.engine is not None:
+            data		= self.resume( final=True )
+            if data is None:
+                raise NonTerminal( "Incomplete frame at end of input, after %d symbols" % (
+                    self.source.sent ))
+            frames.append( data )
+            frames.extend( self.finish() )
+        return frames
+
+    def resume( self, final=False ):
+        """Continue parsing the current frame; returns its data artifact if complete, otherwise None.
+        Unless final, a frame that could be continued by further input is not yet complete.  Any
+        failure to parse discards the current frame, and is raised."""
+        source			= self.source
+        if self.parser:
+            data		= dotdict()
+            start		= source.offset
+            try:
+                end		= self.parser( source.buffer, data, offset=start, final=final )
+            except NonTerminal:
+                return None
+            if end == start:
+                return None	# No progress possible on this input
+            source.take( end - start )
+        else:
+            if self.engine is None:
+                self.data	= dotdict()
+                self.start	= source.sent
+                self.engine	= self.machine.run(
+                    source=source, path=self.path, data=self.data )
+            try:
+                for which,state in self.engine:
+                    if state is None and source.peek() is None:
+                        if not final or not self.machine.terminal:
+                            return None	# Awaiting input; the frame may yet continue
+                        self.engine.close()	# Terminal, and no more input; the frame is complete
+                        break
+            except:
+                self.engine	= None
+                raise
+            data,self.engine,self.data = self.data,None,None
+            if source.sent == self.start:
+                return None	# No progress possible on this input
+        source.forget()
+        return data
+
+
+# 
+# regex_cache	-- Memoizes (and optionally persists) the state machines produced from regexes
+# 
+#     Converting a regular expression via greenery into a state machine graph is expensive, and is
+# performed every time a regex (eg. string, integer, ...) dfa is constructed.  Instead, the graph is
+# reduced to a simple transition table (a tuple of plain Python literals), memoized in-process by
+# regex, state class, alphabet, encoder and typecode; a fresh graph of states is rebuilt from the
+# table for each machine.  If regex_cache_path names a directory, tables are also saved there (as
+# Python literals, loaded via ast.literal_eval), so process startup may skip greenery entirely.
+# 
+regex_cache			= {}	# { <key>: <table> }
+regex_cache_path		= None	# Directory to persist tables (if any)
+
+
+def _regex_key_part( thing ):
+    """A stable (across processes) description of a regex option, such as an alphabet or encoder."""
+    if hasattr( thing, '__code__' ):
+        return "%s:%d" % ( misc.function_name( thing ), thing.__code__.co_firstlineno )
+    return repr( thing )
+
+
+def regex_table( cls, machine, encoder=None, **kwds ):
+    """Returns the (memoized) transition table of the regex state machine produced by
+    cls.from_regex, or None if the supplied machine is not a str regex.  The table is:
+
+        ( <regexstr>, ( (<name>, <terminal>, ( (<symbol>, <target index>|None), ...)), ...))
+
+    where the first entry describes the initial state."""
+    if not isinstance( machine, type_str_base ):
+        return None
+    key				= repr( (cls.__module__ + '.' + cls.__name__, machine, _regex_key_part( encoder ))
+                                + tuple( (k, _regex_key_part( v ))
+                                         for k,v in sorted( kwds.items() )))
+    table			= regex_cache.get( key )
+    if table is not None:
+        return table
+    filename			= None
+    if regex_cache_path:
+        filename		= os.path.join( regex_cache_path, "%s.regex" % (
+            hashlib.sha1( key.encode( 'utf-8' )).hexdigest() ))
+        try:
+            with open( filename, 'r' ) as f:
+                saved,table	= ast.literal_eval( f.read() )
+            if saved != key:
+                table		= None
+        except Exception:
+            table		= None
+    if table is None:
+        regexstr,_,_,initial	= cls.from_regex( machine, encoder=encoder, **kwds )
+        # The initial state is a no-input copy of the original, named with a trailing "'"
+        nodes			= list( initial.nodes() )
+        index			= dict( (id( n ), i) for i,n in enumerate( nodes ))
+        table			= ( regexstr, tuple(
+            ( n.name[:-1] if i == 0 else n.name, n._terminal, tuple(
+                ( sym, None if dst is None else index[id( dst )] )
+                for sym,dst in dict.items( n )))
+            for i,n in enumerate( nodes )))
+        if filename:
+            try:
+                with open( filename + '.tmp', 'w' ) as f:
+                    f.write( repr( (key, table) ))
+                os.rename( filename + '.tmp', filename )
+            except Exception:
+                pass
+    regex_cache[key]		= table
+    return table
+
+
 class regex( dfa ):
     """Takes a regex in string or greenery.lego/fsm form, and converts it to a
     dfa.  We need to specify what type of characters our greenery.fsm
@@ -1379,7 +2355,7 @@ class regex( dfa ):
                   regex_typecode=type_str_array_symbol,
                   regex_context=None, **kwds ):
         assert initial
-        regexstr, lego, machine, initial = regex_states.from_regex(
+        regexstr, initial	= regex_states.from_regex_cached(
             initial, alphabet=regex_alphabet, encoder=regex_encoder, 
             typecode=regex_typecode, context=regex_context )
         super( regex, self ).__init__( name or repr( regexstr ), initial=initial, **kwds )
@@ -1466,8 +2442,6 @@ class string_base( object ):
                       exception )
             return
         subs			= self.initial.context( ours )
-        log.info( "%s: data[%s] = data[%s]: %r", self.name_centered(),
-                  ours, subs, data[subs] if subs in data else data )
         value			= data[subs]
         if isinstance( value, array.array ):
             if value.typecode == 'c':
@@ -1479,6 +2453,8 @@ class string_base( object ):
         if self.decode is not None:
             value		= value.decode( self.decode )
         data[ours]		= value
+        if trace is not None:
+            trace( 'string', machine=machine, state=self, path=ours, value=value )
 
 
 class string( string_base, regex ):
@@ -1512,9 +2488,9 @@ class integer_base( string_base ):
         super( integer_base, self ).terminate(
             exception=exception, machine=machine, path=path, data=data )
 
-        log.info( "%s: int( data[%s]: %r)", self.name_centered(),
-                  ours, data[ours] if ours in data else data )
         data[ours]		= int( data[ours] )
+        if trace is not None:
+            trace( 'integer', machine=machine, state=self, path=ours, value=data[ours] )
 
 
 class integer( integer_base, regex ):
@@ -1554,5 +2530,6 @@ class regex_bytes_promote( regex_bytes ):
             return
 
         subs			= self.initial.context( ours )
-        log.info( "data[%s] = data[%s]: %r", ours, subs, data[subs] if subs in data else data )
         data[ours]		= data[subs]
+        if trace is not None:
+            trace( 'promote', machine=machine, state=self, path=ours, value=data[ours] )
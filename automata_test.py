@@ -10,10 +10,12 @@ from __future__ import print_function
 from __future__ import unicode_literals
 from __future__ import division
 
+import array
 import binascii
 import logging
 import pytest
 import sys
+import threading
 import timeit
 
 import cpppo
@@ -24,6 +26,28 @@ log_not				= 0
 #log.setLevel( logging.INFO )
 #log.setLevel( logging.DEBUG )
 
+# A sentence of a small regex machine, shared by the tests of the state machinery's features
+sentence			= str( 'abcbcb0123x!' ).encode( 'ascii' )
+
+def sentence_machine( name, **kwds ):
+    """A regex_bytes machine recognizing sentence (and similar), collecting its input in data.input."""
+    return cpppo.regex_bytes( name=str( name ), initial=str( 'a(b|c)*[0-9]+x.' ), context='data', **kwds )
+
+def run_machine( machine, source, data=None ):
+    """Run the machine over the source 'til it terminates (or fails).  Returns the (name,state) of each
+    transition yielded, the data artifact, the number of symbols sent, and the Exception (if any)."""
+    source			= cpppo.peekable( source )
+    data			= cpppo.dotdict() if data is None else data
+    trans,failure		= [],None
+    try:
+        with machine:
+            for m,s in machine.run( source=source, data=data ):
+                trans.append( (m.name,s) )
+    except Exception as exc:
+        failure			= type( exc )
+    return trans,data,source.sent,failure
+
+
 def test_logging():
     # Test lazy log message evaluation, ensuring it is at least an order of
     # magnitude better for log messages with format arguments that are expensive
@@ -748,3 +772,569 @@ def test_decode():
         assert not sys.version_info[0] < 3, \
             "Shouldn't have failed in Python2; str/bytes iterator both produce str"
 
+
+def test_compile():
+    """Compiled state transition tables must yield exactly the same transitions as the full lookup."""
+    machine			= sentence_machine( 'compile' )
+    texts			= ( sentence, b'ac9x', b'abz', b'', b'x' )
+    plain			= [ run_machine( machine, text ) for text in texts ]
+    assert plain[0][2] == len( sentence ) and plain[0][3] is None
+    assert plain[2][3] is not None			# A rejected sentence fails the same way
+
+    assert machine.compile() > 0
+    assert machine.compile() > 0			# Recompiling is harmless
+    compiled			= [ s for s in machine.initial.nodes() if s._table is not None ]
+    assert compiled
+    assert [ run_machine( machine, text ) for text in texts ] == plain
+
+    # Every byte symbol (and no symbol) finds the same transition, compiled or not
+    symbols			= [ None ] + list( cpppo.peekable( bytes( bytearray( range( 256 )))))
+    for sta in compiled:
+        for sym in symbols:
+            try:
+                expect		= sta._lookup( sym )
+            except KeyError:
+                expect		= KeyError
+            assert sta.get( sym, KeyError ) is expect
+
+    # Recognizers (pure predicates) are compiled in, in their order of precedence
+    digit,other			= cpppo.state( str( 'digit' )),cpppo.state( str( 'other' ))
+    sta				= cpppo.state( str( 'recog' ))
+    sta[b'0'[0]]		= other
+    sta[lambda s: b'0'[0] <= s <= b'9'[0]] = digit
+    sta[True]			= other
+    assert sta.compile() == 1 and sta._table is not None
+    assert sta[b'0'[0]] is other and sta[b'5'[0]] is digit and sta[b'a'[0]] is other
+    assert sta.get( None, KeyError ) is KeyError	# No epsilon transition
+
+    # ... but a recognizer that fails on some byte symbol leaves the state uncompiled, but working
+    def fussy_b( sym ):
+        if sym == b'!'[0]:
+            raise ValueError( "Unexpected symbol" )
+        return sym == b'b'[0]
+    fussy			= cpppo.state( str( 'fussy' ))
+    fussy[fussy_b]		= digit
+    assert fussy.compile() == 0 and fussy._table is None
+    assert fussy[b'b'[0]] is digit
+
+    # Altering any transition reverts the state to the full lookup
+    sta[b'z'[0]]		= None
+    assert sta._table is None
+    assert sta[b'z'[0]] is None and sta[b'5'[0]] is digit
+
+    # Machines over non-byte symbols (eg. Python3 str) are left uncompiled, but still work
+    machine			= cpppo.regex( name=str( 'uncompiled' ), initial=str( 'a*b' ))
+    machine.compile()
+    assert run_machine( machine, str( 'aab' ))[2] == 3
+
+
+def test_run_buffer():
+    """Running over buffers must produce the same results as symbol-wise run, only surfacing
+    non-transitions when more input is required."""
+    text			= sentence + b'?'
+    machine			= sentence_machine( 'buffer' )
+
+    # All input in one buffer, starting at an offset; no yields; trailing input remains
+    source			= cpppo.chainable()
+    data			= cpppo.dotdict()
+    with machine:
+        yields			= list( machine.run_buffer( b'##' + text, offset=2, source=source, data=data ))
+    assert yields == []
+    assert source.sent == len( text ) - 1
+    assert source.peek() == b'?'[0]
+    assert data.data.input.tostring() == text[:-1]
+    assert not machine.quiet				# Restored on completion
+
+    # Input arriving in chunks via .send (or chained directly onto the source, and None sent); only
+    # yields when each chunk is exhausted.  An offset at the end of the initial buffer yields
+    # immediately.
+    chunks			= [ text[i:i+3] for i in range( 0, len( text ), 3 ) ]
+    source			= cpppo.chainable()
+    data			= cpppo.dotdict()
+    with machine:
+        engine			= machine.run_buffer( b'##', offset=2, source=source, data=data )
+        waits			= 0
+        try:
+            which,state		= next( engine )
+            assert which is machine and state is None
+            for chunk in chunks:
+                waits	       += 1
+                assert state is None and source.peek() is None
+                if waits % 2:
+                    which,state	= engine.send( chunk )
+                else:
+                    source.chain( chunk )
+                    which,state	= engine.send( None )
+            assert False, "Should have completed on the final chunk"
+        except StopIteration:
+            pass
+    assert waits == len( chunks )
+    assert source.sent == len( text ) - 1
+    assert data.data.input.tostring() == text[:-1]
+
+    # Sending no further input indicates the end of the input; an incomplete sentence fails
+    try:
+        with machine:
+            engine		= machine.run_buffer( text[:5] )
+            next( engine )
+            engine.send( b'' )
+        assert False, "Should have failed on an incomplete sentence"
+    except cpppo.NonTerminal:
+        pass
+
+    # A rejected sentence fails just as it does when run symbol-wise; quiet is restored, as it is
+    # when the generator is discarded
+    failure			= run_machine( machine, b'abz' )[3]
+    assert failure is not None
+    try:
+        with machine:
+            list( machine.run_buffer( b'abz' ))
+        assert False, "Should have rejected the sentence"
+    except failure:
+        pass
+    assert not machine.quiet
+    with machine:
+        engine			= machine.run_buffer( b'ab' )
+        next( engine )
+        assert machine.quiet
+        engine.close()
+    assert not machine.quiet
+
+
+def test_buffering():
+    """A buffering source yields the same symbols as the equivalent bytes, with remembering semantics"""
+    b				= cpppo.buffering( b'123' )
+    assert isinstance( cpppo.rememberable( b ), cpppo.buffering )
+    assert cpppo.chainable( b ) is cpppo.peekable( b ) is b
+    assert b.peek() == b'1'[0]
+    assert next( b ) == b'1'[0]
+    assert b.memory.tobytes() == b'1'
+    try:
+        b.push( b'x'[0] )
+        assert False, "Should have rejected push of inconsistent symbol"
+    except AssertionError:
+        pass
+    assert b.sent == 1
+    b.push( b'1'[0] )
+    assert b.sent == 0
+    assert b.memory.tobytes() == b''
+    assert b.remaining.tobytes() == b'123'
+
+    b.chain( bytearray( b'45' ))
+    b.chain( memoryview( b'6789' )[1:] )
+    assert list( b ) == list( cpppo.peekable( b'12345789' ))
+    assert b.sent == 8
+    assert b.memory.tobytes() == b'12345789'
+
+    # Forgetting retains the count of symbols sent; memory is held 'til the buffer is compacted
+    held			= b.memory
+    b.forget()
+    assert b.memory.tobytes() == b''
+    b.chain( b'ab' )
+    assert held.tobytes() == b'12345789'
+    assert next( b ) == b'a'[0]
+    assert b.sent == 9
+    assert b.memory.tobytes() == b'a'
+    assert b.remaining.tobytes() == b'b'
+
+    # Push back onto an empty memory
+    b.forget()
+    b.push( b'z'[0] )
+    assert b.sent == 8
+    assert list( b ) == list( cpppo.peekable( b'zb' ))
+    assert b.memory.tobytes() == b'zb'
+
+    b.chain( None )
+    try:
+        next( b )
+        assert False, "Expected TypeError to be raised"
+    except TypeError:
+        pass
+
+
+def test_dfa_pool():
+    """A dfa_pool provides independent clones of a machine, for simultaneous use."""
+    machine			= sentence_machine( 'pool', terminal=True )
+    machine.compile()
+    pool			= cpppo.dfa_pool( machine )
+
+    with pool as one:
+        assert one is not machine and one.lock.locked() and not machine.lock.locked()
+        assert set( one.initial.nodes() ).isdisjoint( machine.initial.nodes() )
+        assert all( ( a._table is None ) == ( b._table is None )
+                    for a,b in zip( one.initial.nodes(), machine.initial.nodes() ))
+        with pool as two:
+            assert two is not one
+            # Run each to completion, interleaved
+            other		= str( 'ac9x?' ).encode( 'ascii' )
+            data1,data2		= cpppo.dotdict(),cpppo.dotdict()
+            running		= [ one.run( source=cpppo.peekable( sentence ), data=data1 ),
+                                    two.run( source=cpppo.peekable( other ), data=data2 ) ]
+            while running:
+                for engine in list( running ):
+                    try:
+                        next( engine )
+                    except StopIteration:
+                        running.remove( engine )
+            assert data1.data.input.tostring() == sentence
+            assert data2.data.input.tostring() == other
+    assert not one.lock.locked() and not two.lock.locked()
+    with pool as again:
+        assert again in ( one, two )
+
+    # A clone whose run failed is unlocked and returned to the pool, and is usable again
+    pool			= cpppo.dfa_pool( machine )
+    try:
+        with pool as failed:
+            for m,s in failed.run( source=cpppo.peekable( b'abz' ), data=cpppo.dotdict() ):
+                pass
+        assert False, "Should have rejected the sentence"
+    except cpppo.NonTerminal:
+        pass
+    assert not failed.lock.locked() and pool.idle == [ failed ]
+    data			= cpppo.dotdict()
+    with pool as again:
+        assert again is failed
+        for m,s in again.run( source=cpppo.peekable( sentence ), data=data ):
+            pass
+        assert again.terminal
+    assert data.data.input.tostring() == sentence
+
+    # Simultaneous Threads each receive a distinct clone; no more are created than are in use at once
+    pool			= cpppo.dfa_pool( machine )
+    ready			= threading.Barrier( 4 ) if hasattr( threading, 'Barrier' ) else None
+    used,results		= [],[]
+    def parse():
+        with pool as mch:
+            used.append( mch )
+            if ready is not None:
+                ready.wait()
+            data		= cpppo.dotdict()
+            for m,s in mch.run( source=cpppo.peekable( sentence ), data=data ):
+                pass
+            results.append( data.data.input.tostring() )
+    threads			= [ threading.Thread( target=parse ) for _ in range( 4 ) ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [ sentence ] * 4
+    assert len( pool.idle ) == len( set( map( id, used ))) <= 4
+    if ready is not None:
+        assert len( pool.idle ) == 4
+
+    # After clear, clones in use are not returned to the pool
+    with pool as three:
+        pool.clear()
+    assert pool.idle == []
+
+
+def test_dfa_quiet():
+    """A quiet machine consumes nested transitions where they occur, yielding the same results, with
+    a number of yields per symbol independent of the depth of nesting."""
+    def nested( depth ):
+        machine			= sentence_machine( 'inner', terminal=True )
+        for d in range( depth ):
+            machine		= cpppo.dfa( str( 'level%d' % d ), initial=machine, terminal=True )
+        return machine
+
+    counts			= {}
+    for depth in ( 1, 5 ):
+        for quiet in ( False, True ):
+            machine		= nested( depth )
+            machine.quiet	= quiet
+            trans,data,sent,failure = run_machine( machine, sentence )
+            assert failure is None and machine.terminal
+            assert data.data.input.tostring() == sentence
+            counts[depth,quiet] = len( trans )
+    assert counts[1,True] == counts[5,True] < counts[1,False] < counts[5,False]
+
+    # Non-transitions awaiting input are still surfaced, through every enclosing machine
+    machine			= nested( 3 )
+    machine.quiet		= True
+    source			= cpppo.chainable( sentence[:4] )
+    data			= cpppo.dotdict()
+    stalls			= 0
+    with machine:
+        for m,s in machine.run( source=source, data=data ):
+            if s is None and source.peek() is None:
+                stalls	       += 1
+                if stalls == 1:
+                    source.chain( sentence[4:] )
+    assert stalls == 2 and machine.terminal	# ... and once more at the end of the sentence
+    assert data.data.input.tostring() == sentence
+
+    # A rejected sentence fails just the same
+    assert run_machine( machine, b'abz' )[3] is cpppo.NonTerminal
+
+    # Once no longer quiet, the sub-machines' transitions are surfaced again
+    machine.quiet		= False
+    trans,data,sent,failure	= run_machine( machine, sentence )
+    assert failure is None and len( trans ) > counts[1,False]
+
+
+def test_tracing():
+    """Trace events are only produced when enabled, globally or for a specific machine."""
+    assert cpppo.automata.trace is None
+    text			= str( 'abc0x!' ).encode( 'ascii' )
+    machine			= sentence_machine( 'traced' )
+    outer			= cpppo.dfa( str( 'outer' ), initial=sentence_machine( 'nested' ), terminal=True )
+    other			= cpppo.integer_bytes( name=str( 'other' ))
+
+    def collector():
+        events			= []
+        def hook( event, machine=None, state=None, **kwds ):
+            events.append( (event,machine,kwds) )
+        return events,hook
+
+    events,hook			= collector()
+    cpppo.tracing( hook, machine=machine )
+    try:
+        assert cpppo.automata.trace is not None
+        run_machine( other, b'123 ' )
+        run_machine( machine, text )
+    finally:
+        cpppo.tracing( None, machine=machine )
+    assert cpppo.automata.trace is None
+
+    # Only our machine's events were delivered, with the symbol offset of each input
+    assert events and all( m is machine for _,m,_ in events )
+    inputs			= [ kwds for e,_,kwds in events if e == 'input' ]
+    assert [ kwds['sent'] for kwds in inputs ] == list( range( 1, len( text ) + 1 ))
+    assert [ kwds['path'] for kwds in inputs ] == [ 'data.input' ] * len( text )
+    assert sum( 1 for e,_,_ in events if e == 'transition' ) == len( text )
+
+    # Tracing a machine includes the events of its sub-machines; a machine's hook takes precedence
+    # over the global hook, which receives all other events.  Each may be disabled independently.
+    mine,hook			= collector()
+    every,glob			= collector()
+    cpppo.tracing( hook, machine=outer )
+    cpppo.tracing( glob )
+    try:
+        run_machine( outer, text )
+        run_machine( other, b'1 ' )
+        assert any( m is outer.initial for _,m,_ in mine )
+        assert not any( m in ( outer, outer.initial ) for _,m,_ in every )
+        assert any( m is other for _,m,_ in every )
+        cpppo.tracing( None )
+        assert cpppo.automata.trace is not None
+        del mine[:],every[:]
+        run_machine( other, b'1 ' )
+        run_machine( outer, text )
+        assert mine and not every
+    finally:
+        cpppo.tracing( None, machine=outer )
+    assert cpppo.automata.trace is None
+
+    # Global tracing, eg. logging every event
+    cpppo.tracing( cpppo.trace_log )
+    try:
+        assert run_machine( other, b'123 ' )[3] is None
+    finally:
+        cpppo.tracing( None )
+    assert cpppo.automata.trace is None
+
+    # Discarding a run before completion is reported (not logged)
+    events,hook			= collector()
+    cpppo.tracing( hook )
+    try:
+        with other:
+            engine		= other.run( source=cpppo.peekable( b'12' ), data=cpppo.dotdict() )
+            for m,s in engine:
+                if s is None:
+                    break
+            engine.close()
+    finally:
+        cpppo.tracing( None )
+    closed			= [ kwds for e,_,kwds in events if e == 'closed' ]
+    assert closed and all( 'terminal' in kwds for kwds in closed )
+
+
+def test_profiler():
+    """A profiler accounts the activity of each state of a machine, and its sub-machines."""
+    assert cpppo.automata.profiling is None
+    inner			= sentence_machine( 'inner', terminal=True )
+    outer			= cpppo.dfa( str( 'outer' ), initial=inner, repeat=2 )
+    with cpppo.profiler() as prof:
+        assert cpppo.automata.profiling is prof
+        source			= cpppo.chainable( sentence )
+        with outer:
+            for m,s in outer.run( source=source, data=cpppo.dotdict() ):
+                if s is None and source.peek() is None:
+                    source.chain( sentence )
+    assert cpppo.automata.profiling is None
+
+    table			= prof.table( outer )
+    assert table[0][0] is outer
+    assert table[0][1]['entries'] == 1
+    assert table[0][1]['symbols'] == 2 * len( sentence )
+    assert table[0][1]['seconds'] > 0
+    assert table[1][0] is inner
+    assert table[1][1]['entries'] == 2
+    # Every symbol was consumed by some state of the inner sub-machine
+    assert sum( c['symbols'] for s,c in table[2:] ) == 2 * len( sentence )
+    assert any( c['stalls'] for s,c in table ) # awaiting the chained input
+    assert len( prof.table() ) == len( table )
+    dump			= prof.dump( outer )
+    assert len( dump.splitlines() ) == len( table ) + 1
+    assert 'outer' in dump and 'inner' in dump
+
+    # No-input transitions are accounted to the state they leave
+    first,second		= cpppo.state( str( 'first' )),cpppo.state( str( 'second' ), terminal=True )
+    first[None]			= second
+    chained			= cpppo.dfa( str( 'chained' ), initial=first, terminal=True )
+    with cpppo.profiler() as prof:
+        assert run_machine( chained, b'' )[3] is None
+    assert prof.counters( first )['epsilons'] == 1
+    assert prof.counters( second )['epsilons'] == 0
+
+    # Profilers nest, each accounting only while enabled; the previous one is restored on exit, even
+    # on failure.  The symbols consumed by a failed run are accounted.
+    with cpppo.profiler() as prof:
+        run_machine( inner, sentence )
+        try:
+            with cpppo.profiler() as nested:
+                assert run_machine( inner, b'abz' )[3] is cpppo.NonTerminal
+                raise KeyError( "failure" )
+        except KeyError:
+            pass
+        assert cpppo.automata.profiling is prof
+    assert cpppo.automata.profiling is None
+    assert prof.counters( inner )['entries'] == 1
+    assert prof.counters( inner )['symbols'] == len( sentence )
+    assert nested.counters( inner )['entries'] == 1
+    assert nested.counters( inner )['symbols'] == 2
+
+
+def test_parsing():
+    """A parsing context resumes partial frames across feeds, returning each frame as completed; the
+    frames are independent of how the input stream is divided between feeds."""
+    machine			= cpppo.regex_bytes( name=str( 'frame' ), initial=str( '[0-9]+ *' ),
+                                             context='data', terminal=True )
+    frames			= cpppo.parsing( machine )
+    assert frames.parser is None			# not generated; runs a clone of the machine
+    assert frames.machine is not machine
+
+    # A frame that could be continued by further input is held 'til it arrives (or finish)
+    assert frames.feed( b'123' ) == []
+    done			= frames.feed( b'45 ' )
+    assert done == []
+    done			= frames.feed( b'6' )
+    assert [ d.data.input.tostring() for d in done ] == [ b'12345 ' ]
+    assert [ d.data.input.tostring() for d in frames.finish() ] == [ b'6' ]
+    assert frames.finish() == []
+    assert not machine.lock.locked()
+
+    stream			= b'123 45  6 7'
+    expect			= [ b'123 ', b'45  ', b'6 ', b'7' ]
+    for i in range( len( stream ) + 1 ):
+        for j in range( i, len( stream ) + 1 ):
+            frames		= cpppo.parsing( machine )
+            done		= frames.feed( stream[:i] )
+            done	       += frames.feed( stream[i:j] )
+            done	       += frames.feed( stream[j:] )
+            done	       += frames.finish()
+            assert [ d.data.input.tostring() for d in done ] == expect, \
+                "Split at %d, %d: %r" % ( i, j, done )
+
+    # Input ending within an incomplete frame
+    frames			= cpppo.parsing( cpppo.regex_bytes( name=str( 'pair' ), initial=str( '[0-9] [0-9]' ),
+                                                         context='data', terminal=True ))
+    assert frames.feed( b'1 2' + b'3 ' ) != []
+    try:
+        frames.finish()
+        assert False, "Should have failed on an incomplete frame"
+    except cpppo.NonTerminal:
+        pass
+
+
+def test_regex_cache( tmpdir ):
+    """Regex state machines are rebuilt from memoized (and persisted) transition tables."""
+    def parse():
+        machine			= sentence_machine( 'cached', terminal=True )
+        trans,data,sent,failure	= run_machine( machine, sentence )
+        assert failure is None and machine.terminal
+        return machine,data.data.input.tostring()
+
+    cpppo.automata.regex_cache.clear()
+    cpppo.automata.regex_cache_path = str( tmpdir )
+    lego_parse			= cpppo.automata.greenery.lego.parse
+    parsed			= []
+    def counting( *args, **kwds ):
+        parsed.append( args )
+        return lego_parse( *args, **kwds )
+    def fail( *args, **kwds ):
+        raise AssertionError( "greenery should not be used" )
+    try:
+        cpppo.automata.greenery.lego.parse = counting
+        first,text		= parse()
+        assert text == sentence and len( parsed ) == 1
+        assert len( cpppo.automata.regex_cache ) == 1
+        assert len( tmpdir.listdir() ) == 1
+
+        # Memoized in-process, and then persisted; greenery is no longer required.  Each machine
+        # receives its own graph of states.
+        cpppo.automata.greenery.lego.parse = fail
+        second,text		= parse()
+        assert text == sentence
+        assert set( first.initial.nodes() ).isdisjoint( second.initial.nodes() )
+        cpppo.automata.regex_cache.clear()
+        assert parse()[1] == sentence
+
+        # The same regex with different options (eg. the states' context) is distinct
+        cpppo.automata.greenery.lego.parse = counting
+        sentence_machine( 'other', regex_context=str( 'other' ))
+        assert len( parsed ) == 2 and len( cpppo.automata.regex_cache ) == 2
+        assert len( tmpdir.listdir() ) == 2
+
+        # A corrupt persisted table is ignored (and replaced)
+        cpppo.automata.regex_cache.clear()
+        for f in tmpdir.listdir():
+            f.write( 'garbage' )
+        assert parse()[1] == sentence and len( parsed ) == 3
+        cpppo.automata.regex_cache.clear()
+        cpppo.automata.greenery.lego.parse = fail
+        assert parse()[1] == sentence
+    finally:
+        cpppo.automata.greenery.lego.parse = lego_parse
+        cpppo.automata.regex_cache_path = None
+        cpppo.automata.regex_cache.clear()
+
+
+def test_switch():
+    """A switch selects a target state by the value of a single discriminant in the data artifact."""
+    a				= cpppo.state_input( str( 'a' ), terminal=True )
+    b				= cpppo.state_drop( str( 'b' ), terminal=True )
+    sel				= cpppo.state( str( 'select' ))
+    sel[True]			= cpppo.switch( str( 'kind' ), path=str( '..kind' ),
+                                                cases={ 1: a, 2: b } )
+    machine			= cpppo.dfa( str( 'switched' ), initial=sel, context='sw', terminal=True )
+    assert a in list( machine.initial.nodes() ) and b in list( machine.initial.nodes() )
+    def run( kind ):
+        data			= cpppo.dotdict()
+        data.kind		= kind
+        source			= cpppo.chainable( str( 'x' ))
+        with machine:
+            for m,s in machine.run( source=source, data=data ):
+                if s is None and source.peek() is None:
+                    break
+        assert machine.terminal and source.sent == 1
+        return data
+    assert run( 1 ).sw.input == array.array( cpppo.type_str_array_symbol, str( 'x' ))
+    assert 'sw' not in run( 2 )
+    with pytest.raises( cpppo.NonTerminal ):
+        run( 3 )
+
+
+def test_state_context():
+    """A state's context paths are computed once for each path and extension, and interned."""
+    s				= cpppo.state( str( 'ctx' ), context=str( 'boo' ))
+    assert s.context() == 'boo'
+    assert s.context( path=str( 'a.b' ), extension=str( '_' )) == 'a.b.boo_'
+    path			= str( '' ).join( [ str( 'a' ), str( '.b' ) ] )
+    assert s.context( path=path ) is s.context( path=str( 'a.b' ))
+    assert s.context( path=path ) is cpppo.path_intern( str( 'a.b.boo' ))
+    s.contexts_limit		= 2
+    for i in range( 5 ):
+        assert s.context( path=str( 'p%d' % i )) == 'p%d.boo' % i
+    assert len( s._contexts[None] ) <= 2
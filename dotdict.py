@@ -1,7 +1,122 @@
 
 #import logging
+import ast
+import operator
 import threading
 import sys
+import time
+
+class bounded_cache( object ):
+    """A thread-safe cache of (approximately) the most recently used entries, bounded to hold at most
+    'size' entries.  Entries are added to a "hot" generation; when it is full, it becomes the "cold"
+    generation (discarding the prior cold one), and an empty hot generation is started.  Any entry
+    found in the cold generation is promoted back into the hot one, so frequently used entries are
+    retained.  Tracks the number of hits and misses (approximately, if used by several threads)."""
+    def __init__( self, size=4096 ):
+        assert size >= 2, "A bounded_cache must hold at least 2 entries"
+        self.size		= size
+        self.hot		= {}
+        self.cold		= {}
+        self.hits		= 0
+        self.misses		= 0
+        self.lock		= threading.Lock()
+
+    def __len__( self ):
+        return len( self.hot ) + len( self.cold )
+
+    def __contains__( self, key ):
+        return key in self.hot or key in self.cold
+
+    def get( self, key, default=None ):
+        try:
+            val			= self.hot[key]
+        except KeyError:
+            try:
+                val		= self.cold[key]
+            except KeyError:
+                self.misses    += 1
+                return default
+            self[key]		= val # promote
+        self.hits	       += 1
+        return val
+
+    def __setitem__( self, key, val ):
+        hot			= self.hot
+        hot[key]		= val
+        if len( hot ) >= self.size // 2:
+            with self.lock:
+                if self.hot is hot: # Not already retired by another thread
+                    self.cold,self.hot = hot,{}
+
+    def clear( self ):
+        with self.lock:
+            self.hot,self.cold	= {},{}
+            self.hits = self.misses = 0
+
+
+# 
+# compile_key	-- Compile a dotdict key expression (eg. 'l[a.b+c]') into an evaluator function
+# 
+#     Evaluates indexed keys (including simple arithmetic, and references to other values in the
+# dotdict) exactly as eval( <key>, {'__builtins__':{}}, <dotdict> ) would, but parses each key only
+# once; the evaluator is a tree of closures over the parsed key.  Any key containing syntax outside
+# of the supported subset is evaluated using its compiled code object instead.
+# 
+_key_operators			= {
+    ast.Add:		operator.add,
+    ast.Sub:		operator.sub,
+    ast.Mult:		operator.mul,
+    ast.Div:		getattr( operator, 'div', operator.truediv ), # classic division in Python2
+    ast.FloorDiv:	operator.floordiv,
+    ast.Mod:		operator.mod,
+    ast.USub:		operator.neg,
+    ast.UAdd:		operator.pos,
+}
+
+
+def _compile_node( node ):
+    if isinstance( node, ast.Expression ):
+        return _compile_node( node.body )
+    if isinstance( node, ast.Name ):
+        name			= node.id
+        def lookup( env ):
+            try:
+                return env[name]
+            except KeyError:
+                raise NameError( "name %r is not defined" % name )
+        return lookup
+    if isinstance( node, getattr( ast, 'Constant', () )):
+        value			= node.value
+        return lambda env: value
+    if isinstance( node, getattr( ast, 'Num', () )): # Python < 3.8 (incl. 3.6/3.7, which also have Constant)
+        value			= node.n
+        return lambda env: value
+    if isinstance( node, ast.Attribute ):
+        target,attr		= _compile_node( node.value ),node.attr
+        return lambda env: getattr( target( env ), attr )
+    if isinstance( node, ast.Subscript ):
+        index			= node.slice
+        if isinstance( index, ast.Index ): # Python < 3.9
+            index		= index.value
+        target,index		= _compile_node( node.value ),_compile_node( index )
+        return lambda env: target( env )[index( env )]
+    if isinstance( node, ast.BinOp ) and type( node.op ) in _key_operators:
+        lhs,rhs,op		= _compile_node( node.left ),_compile_node( node.right ),_key_operators[type( node.op )]
+        return lambda env: op( lhs( env ), rhs( env ))
+    if isinstance( node, ast.UnaryOp ) and type( node.op ) in _key_operators:
+        arg,op			= _compile_node( node.operand ),_key_operators[type( node.op )]
+        return lambda env: op( arg( env ))
+    raise ValueError( "Unsupported key syntax: %s" % ( type( node ).__name__ ))
+
+
+def compile_key( expr ):
+    """Returns a function evaluating the key expression in the supplied dotdict's context."""
+    try:
+        return _compile_node( ast.parse( expr, mode='eval' ))
+    except ValueError:
+        code			= compile( expr, '<key>', 'eval' )
+        return lambda env: eval( code, {'__builtins__':{}}, env )
+
 
 class dotdict( dict ):
     """A dict supporting keys containing dots, to access a heirarchy of dotdicts and lists of dotdicts.
@@ -102,7 +217,7 @@ class dotdict( dict ):
         """
         return sorted( [ a for a in dir( super( dotdict, self )) if a.startswith( '__' ) ] + list( dict.keys( self )))
 
-    _resolve_cache		= {}
+    _resolve_cache		= bounded_cache( 4096 ) # key --> (mine, rest)
     def _resolve( self, key ):
         """Return next segment in key as (mine, rest), solving for any '..'
         back-tracking.  If key begins/ends with ., or too many .. are used, the
@@ -132,8 +247,9 @@ class dotdict( dict ):
                         #logging.info( '_resolve unbalanced %r.%r"' % ( mine, rest ))
                         if not rest:
                             raise KeyError( "unbalance brackets in %s" % key )
-                        ext,rest= rest.split( '.', 1 )
+                        ext,_,rest = rest.partition( '.' )
                         mine   += '.' + ext
+                    rest	= rest or None
                 break
             mine		= rest
         if not mine:
@@ -142,16 +258,24 @@ class dotdict( dict ):
         dotdict._resolve_cache[key] = tpl = (mine, rest)
         return tpl
 
+    _compiled_cache		= bounded_cache( 1024 ) # key --> evaluator (see compile_key)
+    def _evaluate( self, expr ):
+        """Evaluate an indexed key expression (eg. 'l[a.b+c]') in the context of this dotdict."""
+        function		= dotdict._compiled_cache.get( expr )
+        if function is None:
+            function = dotdict._compiled_cache[expr] = compile_key( expr )
+        return function( self )
+
     def __setitem__( self, key, value ):
         """Assign a value to an item. """
         mine, rest          	= self._resolve( key )
         if rest:
             if '[' in mine:
                 # If indexing used in path down to target, must be pre-existing values
-                target          = eval( mine, {'__builtins__':{}}, self )
+                target          = self._evaluate( mine )
             else:
                 target          = dict.setdefault( self, mine, dotdict() )
-            if not isinstance( target, dotdict ):
+            if not isinstance( target, (dotdict, record) ):
                 raise KeyError( 'cannot set "%s" in "%s" (%r)' % ( rest, mine, target ))
             target[rest]        = value
         else:
@@ -163,7 +287,7 @@ class dotdict( dict ):
                 # final portion of the key; break out the attr[indx], and safely eval it to get the
                 # actual index.  Finally, get the object and let it do its own __setitem__.
                 mine, indx	= mine.split( '[', 1 )
-                indx		= eval( indx[:-1], {'__builtins__':{}}, self )
+                indx		= self._evaluate( indx[:-1] )
                 dict.__getitem__( self, mine )[indx] = value
             else:
                 dict.__setitem__( self, mine, value )
@@ -187,7 +311,7 @@ class dotdict( dict ):
         must return AttributeError if the attribute doesn't exist."""
         mine, rest              = self._resolve( key )
         if '[' in mine:
-            target              = eval( mine, {'__builtins__':{}}, self )
+            target              = self._evaluate( mine )
         else:
             target              = dict.__getitem__( self, mine )
         if rest is None:
@@ -247,7 +371,7 @@ class dotdict( dict ):
         target			= self[mine]
         if rest is None:
             # will raise KeyError if partial key (dotdict layer) not empty
-            if isinstance( target, dotdict ) and len( target ):
+            if isinstance( target, (dotdict, record) ) and len( target ):
                 raise KeyError( 'cannot del "%s" (partial key)' % ( mine ))
             return dict.__delitem__( self, mine )
         del target[rest]
@@ -260,7 +384,7 @@ class dotdict( dict ):
         if rest is None:
             return dict.pop( self, mine, *args[1:] )
         target                  = dict.__getitem__( self, mine )
-        if not isinstance( target, dotdict ):
+        if not isinstance( target, (dotdict, record) ):
             raise KeyError( 'cannot pop "%s" in "%s" (%r)' % ( rest, mine, target ))
         return target.pop( rest, *args[1:] )
 
@@ -276,16 +400,35 @@ class dotdict( dict ):
         except KeyError:
             return default
 
+    def clone( self ):
+        """Returns a copy-on-write structural copy of this dotdict, without walking the tree.  The
+        copy initially shares all of its dotdict layers with the original; a layer is (shallowly)
+        copied only when it is accessed via the copy, so altering the structure of the copy (eg. by
+        adding, replacing or deleting keys) never alters the original.  As for dotdict( <dotdict> ),
+        all other values (eg. lists, bytearrays) remain shared; replace them instead of altering them.
+
+            >>> a = dotdict( {'b': { 'c': 1 }, 'd': 2 } )
+            >>> z = a.clone()
+            >>> z.b.c = 3
+            >>> a.b.c, z.b.c
+            (1, 3)
+
+        """
+        return _overlay( self )
+
+    def _toplevel( self ):
+        """Generates the (<key>, <value>) of each top-level key."""
+        return dict.iteritems( self ) if sys.version_info[0] < 3 else iter( dict.items( self ))
+
     def iteritems( self ):
         """Issue keys for layers of dotdict() in a.b.c... form.  For dotdicts containing a list of
         dotdict, issue keys in a.b[0].c form, since we can handle simple indexes in paths for
         indexing (we'll arbitrarily limit it to just one layer deep)."""
-        items			= dict.iteritems if sys.version_info[0] < 3 else dict.items
-        for key,val in items( self ):
-            if isinstance( val, dotdict ) and val: # a non-empty sub-dotdict layer
+        for key,val in self._toplevel():
+            if isinstance( val, (dotdict, record) ) and val: # a non-empty sub-dotdict layer
                 for subkey,subval in val.iteritems():
                     yield key+'.'+subkey, subval
-            elif isinstance( val, list ) and all( isinstance( subelm, dotdict ) for subelm in val ):
+            elif isinstance( val, list ) and all( isinstance( subelm, (dotdict, record) ) for subelm in val ):
                 for subidx,subelm in enumerate( val ):
                     for subkey,subval in subelm.iteritems():
                         yield key+'['+str(subidx)+'].'+subkey, subval
@@ -315,12 +458,269 @@ class dotdict( dict ):
     items			= __listitems  if sys.version_info[0] < 3 else iteritems
 
 
+class _overlay( dotdict ):
+    """A dotdict.clone(); the keys in _shared identify the dotdict layers still shared with the original.
+    Any access to a shared layer (except a mere test for the presence of a key) first replaces it with
+    a clone of its own, since the caller may then alter it; replacing or deleting it just disowns it."""
+    __slots__			= ( '_shared', )
+
+    def __init__( self, origin ):
+        dict.__init__( self, origin._toplevel() ) # not origin; py3 would iterate its dotted keys()
+        object.__setattr__( self, '_shared', set(
+            k for k,v in origin._toplevel() if isinstance( v, dotdict )))
+
+    def _own( self, key, replace=False ):
+        mine, rest		= self._resolve( key )
+        if mine in self._shared:
+            self._shared.discard( mine )
+            if rest is not None or not replace:
+                dict.__setitem__( self, mine, dict.__getitem__( self, mine ).clone() )
+
+    def __getitem__( self, key ):
+        if self._shared:
+            self._own( key )
+        return dotdict.__getitem__( self, key )
+
+    def __setitem__( self, key, value ):
+        if self._shared:
+            self._own( key, replace=True )
+        dotdict.__setitem__( self, key, value )
+
+    def __delitem__( self, key ):
+        if self._shared:
+            self._own( key ) # may be refused (a non-empty layer), so don't just disown it
+        dotdict.__delitem__( self, key )
+
+    def pop( self, *args ):
+        if self._shared:
+            self._own( args[0], replace=True )
+        return dotdict.pop( self, *args )
+
+    def __contains__( self, key ):
+        try:
+            dotdict.__getitem__( self, key )
+            return True
+        except KeyError:
+            return False
+
+    def __reduce__( self ):
+        """A copy of a clone is just a dotdict (with the same layers)."""
+        return dotdict, ( dict.copy( self ), )
+
+
+class record( object ):
+    """The base of the slotted record types produced by record_type; a fixed schema of fields, each
+    stored in a slot instead of in a dict, yet supporting the same dotted key (and attribute) access
+    as a dotdict, so a state machine may parse into a record exactly as into a dotdict:
+
+        >>> header = record_type( 'header', ( 'command', 'length', ( 'context', dotdict ), ))
+        >>> h = header()
+        >>> h['command'] = 0x65
+        >>> h['context.input'] = b'...'	# creates the 'context' layer, of the declared type
+        >>> h.command, 'length' in h
+        (101, False)
+
+    A field is absent 'til assigned.  Any key not in the schema is held in an ordinary dotdict, so a
+    record remains compatible with any code expecting a dotdict; only the declared fields gain the
+    reduced memory and faster access of slots.  Records and dotdicts may be freely nested.
+
+    """
+    __slots__			= ( '_extra', )
+    _fields			= frozenset()	# The names of the declared fields
+    _types			= {}	# { <field>: <type> } to create each (dotted key) layer
+
+    def __init__( self, *args, **kwds ):
+        object.__setattr__( self, '_extra', None )
+        self.update( *args, **kwds )
+
+    # Resolve keys (and indexes within keys) exactly as a dotdict does
+    _resolve			= dotdict.__dict__['_resolve']
+    _evaluate			= dotdict.__dict__['_evaluate']
+    update			= dotdict.__dict__['update']
+    setdefault			= dotdict.__dict__['setdefault']
+    get				= dotdict.__dict__['get']
+    __contains__		= dotdict.__dict__['__contains__']
+
+    def _get( self, mine ):
+        """Returns the value of the top-level key mine, or raises KeyError."""
+        if mine in self._fields:
+            try:
+                return object.__getattribute__( self, mine )
+            except AttributeError:
+                raise KeyError( mine )
+        if self._extra is None:
+            raise KeyError( mine )
+        return dict.__getitem__( self._extra, mine )
+
+    def _set( self, mine, value ):
+        if mine in self._fields:
+            object.__setattr__( self, mine, value )
+            return
+        if self._extra is None:
+            object.__setattr__( self, '_extra', dotdict() )
+        dict.__setitem__( self._extra, mine, value )
+
+    def _toplevel( self ):
+        """Generates the (<key>, <value>) of each top-level key present."""
+        for mine in type( self ).__slots__: # the declared fields, in order
+            try:
+                yield mine, object.__getattribute__( self, mine )
+            except AttributeError:
+                pass
+        if self._extra:
+            for item in dict.items( self._extra ):
+                yield item
+
+    def __setitem__( self, key, value ):
+        mine, rest		= self._resolve( key )
+        if rest:
+            if '[' in mine:
+                target		= self._evaluate( mine )
+            else:
+                try:
+                    target	= self._get( mine )
+                except KeyError:
+                    target	= self._types.get( mine, dotdict )()
+                    self._set( mine, target )
+            if not isinstance( target, (dotdict, record) ):
+                raise KeyError( 'cannot set "%s" in "%s" (%r)' % ( rest, mine, target ))
+            target[rest]	= value
+        else:
+            if isinstance( value, dict ) and not isinstance( value, dotdict ):
+                value		= self._types.get( mine, dotdict )( value )
+            if '[' in mine and mine[-1] == ']':
+                mine, indx	= mine.split( '[', 1 )
+                self._get( mine )[self._evaluate( indx[:-1] )] = value
+            else:
+                self._set( mine, value )
+
+    def __getitem__( self, key ):
+        mine, rest		= self._resolve( key )
+        if '[' in mine:
+            target		= self._evaluate( mine )
+        else:
+            target		= self._get( mine )
+        if rest is None:
+            return target
+        if not hasattr( target, '__getitem__' ):
+            raise KeyError( 'cannot get "%s" in "%s" (%r); not subscriptable' % ( rest, mine, target ))
+        return target[rest]
+
+    def __setattr__( self, key, value ):
+        self.__setitem__( key, value )
+
+    def __getattr__( self, key ):
+        """Only invoked for absent fields, and keys not in the schema."""
+        if key in self._fields or key.startswith( '_' ):
+            raise AttributeError( key )
+        try:
+            return self._get( key )
+        except KeyError as exc:
+            raise AttributeError( str( exc ))
+
+    def __delitem__( self, key ):
+        mine, rest		= self._resolve( key )
+        target			= self._get( mine )
+        if rest is not None:
+            del target[rest]
+        elif isinstance( target, (dotdict, record) ) and len( target ):
+            raise KeyError( 'cannot del "%s" (partial key)' % ( mine ))
+        elif mine in self._fields:
+            object.__delattr__( self, mine )
+        else:
+            dict.__delitem__( self._extra, mine )
+
+    def pop( self, *args ):
+        key			= args[0]
+        mine, rest		= self._resolve( key )
+        try:
+            target		= self._get( mine )
+        except KeyError:
+            if len( args ) > 1:
+                return args[1]
+            raise
+        if rest is not None:
+            if not isinstance( target, (dotdict, record) ):
+                raise KeyError( 'cannot pop "%s" in "%s" (%r)' % ( rest, mine, target ))
+            return target.pop( rest, *args[1:] )
+        if mine in self._fields:
+            object.__delattr__( self, mine )
+        else:
+            dict.__delitem__( self._extra, mine )
+        return target
+
+    def __reduce__( self ):
+        """Support copy (and deepcopy) by reconstructing from the top-level keys."""
+        return self.__class__, ( dict( self._toplevel() ), )
+
+    def __len__( self ):
+        return sum( 1 for _ in self._toplevel() )
+
+    def __bool__( self ):
+        for _ in self._toplevel():
+            return True
+        return False
+    __nonzero__			= __bool__ # Python2
+
+    def __eq__( self, other ):
+        if isinstance( other, record ):
+            return dict( self._toplevel() ) == dict( other._toplevel() )
+        if isinstance( other, dict ):
+            return dict( self._toplevel() ) == dict.copy( other )
+        return NotImplemented
+
+    def __ne__( self, other ):
+        result			= self.__eq__( other )
+        return result if result is NotImplemented else not result
+
+    __hash__			= None
+
+    def __repr__( self ):
+        return "%s(%s)" % ( self.__class__.__name__, ', '.join(
+            "%s=%r" % ( k, v ) for k,v in self._toplevel() ))
+
+    def __dir__( self ):
+        return sorted( k for k,_ in self._toplevel() )
+
+    iteritems			= dotdict.__dict__['iteritems']
+    itervalues			= dotdict.__dict__['itervalues']
+    iterkeys			= dotdict.__dict__['iterkeys']
+    __iter__			= iterkeys
+
+    def keys( self ):
+        return list( self.iterkeys() )
+
+    def values( self ):
+        return list( self.itervalues() )
+
+    def items( self ):
+        return list( self.iteritems() )
+
+
+def record_type( name, fields, doc=None ):
+    """Returns a new record class called name, with a slot for each of the fields: a name, or a
+    (<name>, <type>) specifying the type of the layer to create for any dotted key within that field
+    (default: dotdict), or to convert any plain dict assigned to it to."""
+    names,types			= [],{}
+    for field in fields:
+        if isinstance( field, tuple ):
+            field,typ		= field
+            types[field]	= typ
+        names.append( str( field ))
+    return type( str( name ), ( record, ), {
+        '__slots__':	tuple( names ),
+        '_fields':	frozenset( names ),
+        '_types':	types,
+        '__doc__':	doc,
+    })
+
+
 class apidict( dotdict ):
     """A dotdict that ensures that any new values assigned to its attributes are very likely received by
     some other thread (via getattr) before the corresponding setattr returns; setting/getting values
-    by indexing (ie. like a normal dict) is *not* affected (except for locking), allowing the user
-    to selectively force timeout 'til read on some assignments but not others, and to indicate
-    reception of the value on some reads and not others.
+    by indexing (ie. like a normal dict) is *not* affected, allowing the user to selectively force
+    timeout 'til read on some assignments but not others, and to indicate reception of the value on
+    some reads and not others.
 
     A specified timeout (required as first argument) is enforced after setattr, which is only
     shortened when another thread executes a getattr.
@@ -328,32 +728,69 @@ class apidict( dotdict ):
     Note that getting *any* attr on the apidict releases all threads blocked setting *any* attr!
     So, use index access to read the bulk of values, and finally a single getattr to access the last
     value, and indicate completion of access.
+
+    Only threads blocked in a setattr (or in watch) ever wait; reading and indexed assignment
+    acquire no lock, unless some thread is actually waiting to be released.  Every assignment
+    advances the version returned by changes(), so an observer may watch for new values without
+    polling:
+
+        >>> ver = stats.changes()
+        >>> ver = stats.watch( ver, timeout=1.0 ) # 'til any value is assigned (or timeout)
+
     """
-    __slots__ = ('_lck', '_cnd', '_tmo')
+    __slots__ = ('_lck', '_cnd', '_chg', '_tmo', '_ver', '_setters', '_watchers')
     def __init__( self, timeout, *args, **kwds ):
         assert isinstance( timeout, (float,int) ), \
             "First argument to apidict must be a numeric timeout"
         object.__setattr__( self, '_lck', threading.RLock() )
-        object.__setattr__( self, '_cnd', threading.Condition( self._lck ))
+        object.__setattr__( self, '_cnd', threading.Condition( self._lck )) # setattr 'til getattr
+        object.__setattr__( self, '_chg', threading.Condition( self._lck )) # watch 'til changed
         object.__setattr__( self, '_tmo', timeout )
+        object.__setattr__( self, '_ver', 0 )
+        object.__setattr__( self, '_setters', 0 )
+        object.__setattr__( self, '_watchers', 0 )
         super( apidict, self ).__init__( *args, **kwds )
 
-    def __setitem__( self, key, value ):
-        with self._cnd:
-            super( apidict, self ).__setitem__( key, value )
-        
-    def __setattr__( self, key, value ):
-        with self._cnd:
-            super( apidict, self ).__setattr__( key, value )
-            self._cnd.wait( self._tmo )
+    def changes( self ):
+        """Returns the current version; it advances whenever any value is assigned."""
+        return self._ver
 
-    def __getitem__( self, key ):
-        with self._cnd:
-            return super( apidict, self ).__getitem__( key )
+    def watch( self, version, timeout=None ):
+        """Block 'til the version advances beyond the one supplied (or timeout), returning the
+        current version."""
+        deadline		= None if timeout is None else time.time() + timeout
+        with self._lck:
+            object.__setattr__( self, '_watchers', self._watchers + 1 )
+            try:
+                while self._ver == version:
+                    remains	= None if deadline is None else deadline - time.time()
+                    if remains is not None and remains <= 0:
+                        break
+                    self._chg.wait( remains )
+            finally:
+                object.__setattr__( self, '_watchers', self._watchers - 1 )
+            return self._ver
 
-    def __getattr__( self, key ):
-        with self._cnd:
+    def __setitem__( self, key, value ):
+        super( apidict, self ).__setitem__( key, value )
+        object.__setattr__( self, '_ver', self._ver + 1 )
+        if self._watchers:
+            with self._lck:
+                self._chg.notify_all()
+
+    def __setattr__( self, key, value ):
+        with self._lck:
+            object.__setattr__( self, '_setters', self._setters + 1 )
             try:
-                return super( apidict, self ).__getattr__( key )
+                super( apidict, self ).__setattr__( key, value )
+                self._cnd.wait( self._tmo )
             finally:
-                self._cnd.notify_all()
+                object.__setattr__( self, '_setters', self._setters - 1 )
+
+    def __getattr__( self, key ):
+        try:
+            return super( apidict, self ).__getattr__( key )
+        finally:
+            if self._setters:
+                with self._lck:
+                    self._cnd.notify_all()
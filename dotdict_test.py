@@ -2,13 +2,15 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import division
 
+import ast
+import copy
 import logging
 import sys
 import threading
 import time
 
 from . import misc
-from .dotdict import dotdict, apidict
+from .dotdict import dotdict, apidict, bounded_cache, compile_key, record, record_type, _compile_node
 
 def test_dotdict():
     # Like dict, construct from mapping, iterable and/or keywords
@@ -187,6 +189,148 @@ def test_hasattr():
     #print( dir( d ))
 
 
+def test_bounded_cache():
+    cache			= bounded_cache( 8 )
+    for i in range( 100 ):
+        cache[i]		= str( i )
+        assert len( cache ) <= 8
+    assert cache.get( 99 ) == '99' and cache.get( 0 ) is None
+    # A frequently used entry is retained, while others are discarded
+    cache.clear()
+    cache['hot']		= 'x'
+    for i in range( 100 ):
+        cache[i]		= i
+        assert cache.get( 'hot' ) == 'x'
+    assert len( cache ) <= 8
+    assert cache.get( 0 ) is None
+    assert cache.hits == 100 and cache.misses == 1
+
+    # The dotdict key resolution cache stays bounded
+    d				= dotdict()
+    for i in range( 3 * dotdict._resolve_cache.size ):
+        d['a%d.b' % i]		= i
+    assert len( dotdict._resolve_cache ) <= dotdict._resolve_cache.size
+    assert d['a7.b'] == 7
+
+
+def test_compile_key():
+    d				= dotdict()
+    d.a				= dotdict()
+    d.a.b			= 1
+    d.c				= 2
+    d.l				= [ 10, 11, 12, 13 ]
+    for expr in ( 'l[a.b+c]', 'l[c-1]', 'l[-a.b]', 'l[c*c//2]', 'l[(c+1)%3]', 'l[len(l)-1]' ):
+        try:
+            expect		= eval( expr, {'__builtins__':{}}, d )
+        except Exception as exc:
+            expect		= type( exc )
+        try:
+            result		= compile_key( expr )( d )
+        except Exception as exc:
+            result		= type( exc )
+        assert result == expect, "%s: %r != %r" % ( expr, result, expect )
+    # Indexed keys (incl. numeric literals) are evaluated by closures, not by falling back to eval
+    for expr in ( 'l[a.b+c]', 'l[c-1]', 'l[-a.b]', 'l[c*c//2]', 'l[(c+1)%3]', 'item[1]', 'request[3].x' ):
+        _compile_node( ast.parse( expr, mode='eval' ))
+    assert d['l[c+a.b]'] == 13
+    d['l[c-1]']			= 99
+    assert d.l[1] == 99
+    d['l[a.b]']			= 98		# a trailing index containing the only '.'
+    assert d.l[1] == 98 and d['l[a.b]'] == 98
+    assert dotdict._compiled_cache.get( 'l[c+a.b]' ) is not None
+    try:
+        d['l[x]']
+        assert False, "Undefined name should raise"
+    except (NameError, KeyError):
+        pass
+
+
+def test_clone():
+    a				= dotdict( {'b': { 'c': 1, 'e': { 'f': 2 }}, 'd': 3, 'l': [ 4 ] } )
+    z				= a.clone()
+    assert z == a and isinstance( z, dotdict )
+    assert 'b.e.f' in z and dict.__getitem__( z, 'b' ) is a.b # presence tests don't copy
+
+    # Altering the copy's structure (at any depth) never alters the original
+    z.b.c			= 5
+    z['b.e.g']			= 6
+    z.d				= 7
+    z.h				= 8
+    assert a == dotdict( {'b': { 'c': 1, 'e': { 'f': 2 }}, 'd': 3, 'l': [ 4 ] } )
+    assert z['b.c'] == 5 and z['b.e.g'] == 6 and z.d == 7 and z.h == 8
+    assert z.pop( 'b.e.f' ) == 2 and a.b.e.f == 2
+    z2				= a.clone()
+    try:
+        del z2['b']
+        assert False, "Deleting a non-empty layer should raise KeyError"
+    except KeyError:
+        pass
+    z2.b.c			= 9
+    z2.b			= 10		# replacing a layer doesn't copy it
+    assert z2.b == 10 and a.b.c == 1
+    del z2['b']
+    assert 'b' not in z2 and 'b' in a
+
+    # Non-dotdict values remain shared, as for dotdict( <dotdict> )
+    assert z.l is a.l
+    assert copy.copy( z ) == z and type( copy.copy( z )) is dotdict
+
+
+def test_record():
+    inner			= record_type( 'inner', ( 'x', 'y' ))
+    outer			= record_type( 'outer', ( 'a', ( 'b', inner ), 'l' ))
+    r				= outer()
+    assert not r and len( r ) == 0 and 'a' not in r
+    try:
+        r.a
+        assert False, "Absent field should raise AttributeError"
+    except AttributeError:
+        pass
+    r.a				= 1
+    r['b.x']			= 2		# creates the declared 'b' layer
+    assert isinstance( r.b, inner ) and r.b.x == 2 and r['b.x'] == 2
+    r['c.d']			= 3		# undeclared; held in a dotdict layer
+    assert isinstance( r.c, dotdict ) and r['c.d'] == 3
+    r.l				= [ outer( a=10 ), outer( a=11 ) ]
+    assert r['l[1].a'] == 11 and r['l[a-1].a'] == 10
+    assert sorted( r.keys() ) == [ 'a', 'b.x', 'c.d', 'l[0].a', 'l[1].a' ]
+    assert len( r ) == 4 and 'b.x' in r and 'b.y' not in r
+
+    # Equal to a dotdict with the same keys, and usable within one
+    d				= dotdict( a=1, b=dotdict( x=2 ), c=dotdict( d=3 ),
+                                   l=[ dotdict( a=10 ), dotdict( a=11 ) ] )
+    assert r == d and d == r
+    d.r				= r
+    assert d['r.b.x'] == 2 and 'r.c.d' in d
+    d['r.b.y']			= 4
+    assert r.b.y == 4
+
+    # A plain dict assigned to a declared field becomes its declared type
+    r.b				= { 'x': 5 }
+    assert isinstance( r.b, inner ) and r.b.x == 5
+
+    # Partial keys cannot be deleted; pop and del work through layers
+    try:
+        del r['c']
+        assert False, "Deleting a non-empty layer should raise KeyError"
+    except KeyError:
+        pass
+    assert r.pop( 'c.d' ) == 3 and r.pop( 'c.d', None ) is None
+    del r['c']
+    del r['b.x']
+    assert 'c' not in r and 'b.x' not in r
+    assert r.get( 'b.z', 6 ) == 6
+
+    # Copies are independent; records retain no per-instance dict
+    c				= copy.deepcopy( r )
+    assert c == r and c is not r
+    c.a				= 7
+    c['b.x']			= 8
+    assert r.a == 1 and 'b.x' not in r
+    assert not hasattr( r, '__dict__' )
+    assert sys.getsizeof( outer() ) < sys.getsizeof( dotdict( a=1, b=2, l=3 ))
+
+
 repeat = 50
 @misc.assert_tps( repeat=repeat )
 def test_dotdict_speed():
@@ -256,3 +400,23 @@ def test_apidict():
         t.join()
 
     
+
+    # Observers may watch for any assignment, without polling; watching doesn't release setattr
+    def assign( when, item, value ):
+        time.sleep( when - misc.timer() )
+        ad[item] = value
+
+    ver = ad.changes()
+    beg = misc.timer()
+    t = threading.Thread( target=assign, args=(beg + shorter, 'boo', 4) )
+    t.start()
+    now = ad.watch( ver, timeout=latency )
+    dif = misc.timer() - beg
+    assert now != ver and ad['boo'] == 4
+    assert misc.near( dif, shorter, significance=significance )
+    t.join()
+
+    beg = misc.timer()
+    assert ad.watch( now, timeout=shorter ) == now # no change; times out
+    dif = misc.timer() - beg
+    assert misc.near( dif, shorter, significance=significance )
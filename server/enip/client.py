@@ -330,7 +330,7 @@ class client( object ):
                          self.addr[0], self.addr[1], exc )
             pass
         self.session		= None
-        self.source		= cpppo.chainable()
+        self.source		= cpppo.buffering()
         self.data		= None
         # Parsers
         self.engine		= None # EtherNet/IP frame parsing in progress
@@ -400,34 +400,42 @@ class client( object ):
                 if self.engine is None:
                     return None
 
-        # Initiate or continue parsing input using the machine's engine; discard the engine at
-        # termination or on error (Exception).  Any exception (including cpppo.NonTerminal) will be
-        # propagated.
+        # Frame a complete EtherNet/IP response already buffered directly.  Otherwise, initiate or
+        # continue parsing input using the machine's engine; discard the engine at termination or
+        # on error (Exception).  Any exception (including cpppo.NonTerminal) will be propagated.
         result			= None
-        try:
-            if self.engine is None:
-                self.data	= cpppo.dotdict()
-                self.engine	= self.frame.run( source=self.source, data=self.data )
-                
-            for mch,sta in self.engine:
-                if sta is None and self.source.peek() is None:
-                    # Non-transition, and no input available; go get some -- all blocking is done
-                    # externally (in the caller), to allow full operation on I/O latency.  On a
-                    # non-transition from a sub-machine, just loop if input is still available.
-                    return None
-            # Engine has terminated w/ a recognized EtherNet/IP frame.
-        except Exception as exc:
-            log.warning( "EtherNet/IP<x>%16s:%-5d err.: %s",
-                         self.addr[0], self.addr[1], str( exc ))
-            self.engine		= None
-            raise
-        if self.frame.terminal:
+        if self.engine is None:
+            self.data		= enip.enip_frame_record()
+            if enip.enip_frame( self.source, self.data ):
+                result		= self.data
+                self.source.forget()
+        if result is None:
+            try:
+                if self.engine is None:
+                    self.engine	= self.frame.run( source=self.source, data=self.data )
+
+                for mch,sta in self.engine:
+                    if sta is None and self.source.peek() is None:
+                        # Non-transition, and no input available; go get some -- all blocking is
+                        # done externally (in the caller), to allow full operation on I/O latency.
+                        # On a non-transition from a sub-machine, just loop if input is still
+                        # available.
+                        return None
+                # Engine has terminated w/ a recognized EtherNet/IP frame.
+            except Exception as exc:
+                log.warning( "EtherNet/IP<x>%16s:%-5d err.: %s",
+                             self.addr[0], self.addr[1], str( exc ))
+                self.engine	= None
+                raise
+        if result is None and self.frame.terminal:
             log.info( "EtherNet/IP   %16s:%-5d done: %s -> %10.10s; next byte %3d: %-10.10r: %r",
                         self.addr[0], self.addr[1], self.frame.name_centered(), self.frame.current, 
                         self.source.sent, self.source.peek(), self.data )
-            # Got an EtherNet/IP frame.  Return it (after parsing its payload.)
+            # Got an EtherNet/IP frame.  Return it (after parsing its payload.)  Discard the frame's
+            # consumed input, so a long-lived connection's source doesn't retain it.
             self.engine		= None
             result		= self.data
+            self.source.forget()
 
         # Parse the EtherNet/IP encapsulated CIP frame, if any.  If the EtherNet/IP header .size was
         # zero, it's status probably indicates why.
@@ -445,10 +453,13 @@ class client( object ):
                     # An Unconnected Send that contained an encapsulated request (ie. not just a Get
                     # Attribute All).  Use the globally-defined cpppo.server.enip.client's dialect's
                     # (eg. logix.Logix) parser to parse the contents of the CIP payload's CPF items.
-                    with device.dialect.parser as machine:
+                    request	= item.unconnected_send.request
+                    if type( request ) is not device.dialect.request_record:
+                        request	= item.unconnected_send.request \
+				= device.dialect.request_record( request.items() )
+                    with device.dialect.parsers as machine:
                         for mch,sta in machine.run(
-                                source=cpppo.peekable( item.unconnected_send.request.input ),
-                                data=item.unconnected_send.request ):
+                                source=cpppo.peekable( request.input ), data=request ):
                             pass
                         assert machine.terminal, "No %r request in the EtherNet/IP CIP CPF frame: %r" % (
                             device.dialect, result )
@@ -12,8 +12,10 @@ import logging
 import random
 import time
 
+from ... import automata
 from ...dotdict import dotdict, apidict
 from .. import enip, network
+from . import client
 
 log				= logging.getLogger( "cli.test" )
 
@@ -122,3 +124,42 @@ def test_client_api():
                                                  client_count	= clicount,
                                                  client_max	= clipool )
     assert failed == 0
+
+
+def test_client_source_forget():
+    """A long-lived client connection must not retain the input of frames already returned."""
+    import socket
+    svr				= socket.socket( socket.AF_INET, socket.SOCK_STREAM )
+    svr.bind( ('localhost', 0) )
+    svr.listen( 1 )
+    cli				= client.client( host='localhost', port=svr.getsockname()[1] )
+    conn,_			= svr.accept()
+    try:
+        rpy			= dotdict()
+        rpy.enip		= dotdict()
+        rpy.enip.command	= 0x0065 # Register Session reply
+        rpy.enip.session_handle	= 0x12345678
+        rpy.enip.status		= 0
+        rpy.enip.sender_context	= dotdict( input=bytearray( 8 ))
+        rpy.enip.options	= 0
+        rpy.enip.input		= bytearray( b'\x01\x00\x00\x00' )
+        frame			= enip.enip_encode( rpy.enip )
+        count			= 2000
+        conn.sendall( frame * count )
+        done			= 0
+        begun			= time.time()
+        with cli:
+            while done < count and time.time() - begun < 10.0:
+                result		= next( cli )
+                if result is None:
+                    time.sleep( .01 )
+                    continue
+                assert result.enip.session_handle == 0x12345678
+                assert result.enip.CIP.register.options == 0
+                done	       += 1
+        assert done == count
+        assert len( cli.source.memory ) == 0
+        assert len( cli.source.buffer ) < 2 * automata.buffering.compact
+    finally:
+        conn.close()
+        svr.close()
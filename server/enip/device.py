@@ -31,9 +31,10 @@ enip.device	-- support for implementing an EtherNet/IP device Objects and Attrib
 """
 __all__				= ['dialect', 'lookup', 'resolve', 'resolve_element',
                                    'redirect_tag', 'resolve_tag', 
-                                   'Object', 'Attribute',
+                                   'Object', 'Attribute', 'ArrayAttribute',
                                    'UCMM', 'Connection_Manager', 'Message_Router', 'Identity']
 
+import array
 import logging
 import random
 import sys
@@ -342,6 +343,47 @@ class Attribute( object ):
         return b''.join( self.parser.produce( v ) for v in self[start:stop] )
 
 
+class ArrayAttribute( Attribute ):
+    """An Attribute whose array value (ie. a default list of values) is stored in an array.array of the
+    Attribute type's own binary element format, rather than in a list of Python objects.  Slices read
+    return an array.array (which typed_data produces directly from its bytes), and produce renders a
+    range of elements to bytes with a single copy.  A slice written is converted and stored with a
+    single slice assignment; it must contain exactly as many elements as the slice.
+
+    A scalar default (or a type without a fixed-size binary element format, eg. SSTRING), is held
+    exactly as for an Attribute.
+
+    """
+    def __init__( self, name, type_cls, default=0, **kwds ):
+        fmt			= getattr( type_cls, 'struct_format', None )
+        if fmt and not ( isinstance( default, automata.type_str_base ) or not hasattr( default, '__len__' )):
+            typecode		= fmt.lstrip( '<' )
+            if array.array( typecode ).itemsize == type_cls.struct_calcsize:
+                default		= array.array( typecode, default )
+        super( ArrayAttribute, self ).__init__( name=name, type_cls=type_cls, default=default, **kwds )
+
+    def __setitem__( self, key, value ):
+        if isinstance( self.value, array.array ) and self._validate_key( key ) is slice:
+            if not isinstance( value, array.array ) or value.typecode != self.value.typecode:
+                value		= array.array( self.value.typecode, value )
+            start,stop,_	= key.indices( len( self ))
+            assert len( value ) == stop - start, \
+                "Cannot assign %d elements to %d element slice of %s" % ( len( value ), stop - start, self )
+        super( ArrayAttribute, self ).__setitem__( key, value )
+
+    def produce( self, start=0, stop=None ):
+        """Output the binary rendering of the current value, directly from the array's bytes (in wire,
+        ie. little-endian, byte order)."""
+        if not isinstance( self.value, array.array ):
+            return super( ArrayAttribute, self ).produce( start=start, stop=stop )
+        if stop is None:
+            stop		= len( self )
+        elements		= self[start:stop]
+        if sys.byteorder != 'little':
+            elements.byteswap()
+        return elements.tostring() if sys.version_info[0] < 3 else elements.tobytes()
+
+
 class MaxInstance( Attribute ):
     def __init__( self, name, type_cls, class_id=None, **kwds ):
         assert class_id is not None
@@ -431,7 +473,8 @@ class Object( object ):
     be made about whether the request is *allowed*.
 
     The parser knows how to parse any requests it must handle, and any replies it can generate, and
-    puts the results into the provided data artifact.
+    puts the results into the provided data artifact.  Independent clones of the parser are available
+    from the Object's .parsers pool, allowing requests to be parsed in several threads concurrently.
 
     Assuming Obj is an instance of Object, and the source iterator produces the incoming symbols:
 
@@ -497,6 +540,10 @@ class Object( object ):
     # The parser doesn't add a layer of context; run it with a path= keyword to add a layer
     parser			= automata.dfa_post( service, initial=automata.state( 'select' ),
                                                   terminal=True )
+    parsers			= automata.dfa_pool( parser ) # Independent parsers, for concurrent use
+
+    # The type of data artifact each request (or reply) is parsed into; eg. a slotted record type
+    request_record		= dotdict
 
     @classmethod
     def register_service_parser( cls, number, name, short, machine ):
@@ -510,6 +557,7 @@ class Object( object ):
         cls.transit[number]	= chr( number ) if sys.version_info[0] < 3 else number
         cls.parser.initial[cls.transit[number]] \
 				= automata.dfa( name=short, initial=machine, terminal=True )
+        cls.parsers.clear()
 
     
     GA_ALL_NAM			= "Get Attributes All"
@@ -852,6 +900,7 @@ class UCMM( Object ):
     class_id			= 0x9999	# Not an addressable Object
 
     parser			= CIP()
+    parsers			= automata.dfa_pool( parser )
     command			= {
         0x0065: "Register Session",
         0x0066: "Unregister Session",
@@ -1336,8 +1385,8 @@ class state_multiple_service( automata.state ):
 
             Match up pairs of offsets[oi,oi+1], and use the target Object to parse the snippet of
             request data payload into request[oi].  Last request offset gets balance of request
-            data.  If the DFA is in use (eg. we're using our own Object's parser), schedule it for
-            post-processing.
+            data.  An independent instance of the target's parser is obtained from its pool, so
+            this is safe even if the parser is in use (eg. we're using our own Object's parser).
 
             """
             if log.isEnabledFor( logging.DETAIL ):
@@ -1355,7 +1404,7 @@ class state_multiple_service( automata.state ):
                     log.detail( "%s Parsing: %3d-%3d of %r", target, beg, end, reqdata )
                 req		= dotdict()
                 req.input	= reqdata[beg:end]
-                with target.parser as machine:
+                with target.parsers as machine:
                     source	= automata.peekable( req.input )
                     for m,s in machine.run( source=source, data=req ):
                         pass
@@ -1364,14 +1413,7 @@ class state_multiple_service( automata.state ):
                             machine.name_centered(), oi )
                 request.append( req )
 
-        # If anyone holds the lock, post-process the closure.  In a multi-threaded environment, this
-        # _requires_ that any parser that uses this class _must_ be locked during use -- or, these
-        # closures will not be run.  All Object parsers are derived from dfa_post, which is capable
-        # of post-processing a Thread's closures after being unlocked.
-        if target.parser.lock.locked():
-            target.parser.post_process_closure( closure )
-        else:
-            closure()
+        closure()
         if log.isEnabledFor( logging.DETAIL ):
             log.detail( "%s Parsed: %s", target, enip_format( data ))
                    
@@ -1504,9 +1546,11 @@ class Connection_Manager( Object ):
         # Get the Message Router to parse and process the request into a response, producing a
         # data.request.input encoded response, which we will pass back as our own encoded response.
         MR			= lookup( class_id=0x02, instance_id=1 )
-        source			= automata.rememberable( data.request.input )
+        if type( data.request ) is not MR.request_record:
+            data.request	= MR.request_record( data.request.items() )
+        source			= automata.buffering( data.request.input )
         try: 
-            with MR.parser as machine:
+            with MR.parsers as machine:
                 for i,(m,s) in enumerate( machine.run( path='request', source=source, data=data )):
                     pass
                     #log.detail( "%s #%3d -> %10.10s; next byte %3d: %-10.10r: %s",
@@ -1518,9 +1562,9 @@ class Connection_Manager( Object ):
         except:
             # Parsing failure.  We're done.  Suck out some remaining input to give us some context.
             processed		= source.sent
-            memory		= bytes(bytearray(source.memory))
-            pos			= len( source.memory )
-            future		= bytes(bytearray( b for b in source ))
+            memory		= source.memory.tobytes()
+            pos			= len( memory )
+            future		= source.remaining.tobytes()
             where		= "at %d total bytes:\n%s\n%s (byte %d)" % (
                 processed, repr(memory+future), '-' * (len(repr(memory))-1) + '^', pos )
             log.error( "EtherNet/IP CIP error %s\n", where )
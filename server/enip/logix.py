@@ -35,7 +35,7 @@ import sys
 import threading
 import traceback
 
-from ...dotdict import dotdict
+from ...dotdict import dotdict, record_type
 from ... import automata
 from .device import ( Object, Attribute, Message_Router, Connection_Manager, UCMM, Identity,
                       resolve_element, resolve_tag, resolve, redirect_tag, lookup )
@@ -120,6 +120,20 @@ class Unknown_Object( Object ):
             self.attribute['12']= Attribute( 'Unknown 12', 		UINT,  default=0x000a )
 
 
+# 
+# tag_request_record	-- A slotted record type for a parsed Logix request (or reply)
+# 
+#     Logix requests and replies (eg. a Read Tag Fragmented reply's read_frag.type and .data) are parsed
+# into these records instead of into dotdict layers, both by the Connection Manager (in a Controller),
+# and by the client.  Any other keys are available exactly as in a dotdict.
+# 
+read_frag_record		= record_type( 'read_frag_record', (
+    'elements', 'offset', 'type', 'data' ))
+tag_request_record		= record_type( 'tag_request_record', (
+    'input', 'service', 'status', 'status_ext', 'path', ( 'read_frag', read_frag_record ),
+    'read_tag', 'write_frag', 'write_tag' ))
+
+
 class Logix( Message_Router ):
     """A Logix Controller implementation of the CIP Message Router (Class 0x02, Instance 1).  This
     object is targeted by the Connection Manager, to parse and process incoming requests.  
@@ -135,6 +149,8 @@ class Logix( Message_Router ):
     # remaining packet size available, as an argument to the produce method...
     MAX_BYTES			= 500
 
+    request_record		= tag_request_record
+
     RD_TAG_NAM			= "Read Tag"
     RD_TAG_CTX			= "read_tag"
     RD_TAG_REQ			= 0x4c
@@ -589,6 +605,13 @@ def setup( identity_class=None, tags=None ):
 
             setup.ucmm		= UCMM()
 
+            # The request parsers are now complete; freeze their transitions for fast dispatch, and
+            # ensure that any independent instances are cloned from the compiled parsers.
+            Logix.parser.compile()
+            Logix.parsers.clear()
+            setup.ucmm.parser.compile()
+            setup.ucmm.parsers.clear()
+
         # If tags are specified, check that we've got them all set up right.  If the tag doesn't exist,
         # add it.  If it's error code doesn't match, change it.  Since it is possible that the Tags
         # and/or their Error codes could change between calls, we check them
@@ -678,7 +701,7 @@ def process( addr, data, **kwds ):
     """
     ucmm			= setup( identity_class=kwds.get( 'identity_class' ), tags=kwds.get( 'tags' ))
 
-    source			= automata.rememberable()
+    source			= automata.buffering()
     try:
         # Find the Connection Manager, and use it to parse the encapsulated EtherNet/IP request.  We
         # pass an additional request.addr, to allow the Connection Manager to identify the
@@ -690,7 +713,7 @@ def process( addr, data, **kwds ):
             # Some requests have no encapsulated CIP payload (eg. empty ListServices requests)
             if 'input' in data.request.enip:
                 source.chain( data.request.enip.input )
-            with ucmm.parser as machine:
+            with ucmm.parsers as machine:
                 for i,(m,s) in enumerate( machine.run( path='request.enip', source=source, data=data )):
                     #log.detail( "%s #%3d -> %10.10s; next byte %3d: %-10.10r: %s",
                     #            machine.name_centered(), i, s, source.sent, source.peek(),
@@ -699,13 +722,11 @@ def process( addr, data, **kwds ):
         if log.isEnabledFor( logging.DETAIL ):
             log.detail( "EtherNet/IP CIP Request  (Client %16s): %s", addr, enip_format( data.request ))
 
-        # Create a data.response with a structural copy of the data.request.enip.  This means that
-        # the dictionary structure is new (we won't alter the request.enip... when we add entries in
-        # the resonse...), but the actual mutable values (eg. bytearray ) are shared.  If we need to
-        # change any values, replace them with new values instead of altering them!
-        data.response		= dotdict( data.request )
-        if 'enip' in data.request:
-            data.response.enip	= dotdict( data.request.enip )
+        # Create a data.response with a (copy-on-write) structural copy of the data.request.  This
+        # means that the dictionary structure is new (we won't alter the request.enip... when we add
+        # entries in the resonse...), but the actual mutable values (eg. bytearray ) are shared.  If
+        # we need to change any values, replace them with new values instead of altering them!
+        data.response		= data.request.clone()
 
         # Get rid of our raw request encapsulated enip.input; we'll generate a new one for the
         # response, and we don't want to ever be accidentally returning our request as our response
@@ -735,9 +756,9 @@ def process( addr, data, **kwds ):
     except:
         # Parsing failure.  We're done.  Suck out some remaining input to give us some context.
         processed		= source.sent
-        memory			= bytes(bytearray(source.memory))
-        pos			= len( source.memory )
-        future			= bytes(bytearray( b for b in source ))
+        memory			= source.memory.tobytes()
+        pos			= len( memory )
+        future			= source.remaining.tobytes()
         where			= "at %d total bytes:\n%s\n%s (byte %d)" % (
             processed, repr(memory+future), '-' * (len(repr(memory))-1) + '^', pos )
         log.error( "EtherNet/IP CIP error %s\n", where )
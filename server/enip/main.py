@@ -568,8 +568,9 @@ def enip_srv( conn, addr, enip_process=None, delay=None, **kwds ):
     log.normal( "EtherNet/IP Server %s begins serving peer %s", name, addr )
 
 
-    source			= cpppo.rememberable()
+    source			= cpppo.buffering()
     with parser.enip_machine( name=name, context='enip' ) as enip_mesg:
+        enip_mesg.compile()
 
         # We can be provided a dotdict() to contain our stats.  If one has been passed in, then this
         # means that our stats for this connection will be available to the web API; it may set
@@ -591,6 +592,50 @@ def enip_srv( conn, addr, enip_process=None, delay=None, **kwds ):
             stats['eof']	= False
             stats['interface']	= addr[0]
             stats['port']	= addr[1]
+
+            def receive():
+                """No complete message (or no more transitions) available.  Wait for input.  EOF
+                (b'') will lead to termination.  We will simulate non-blocking by looping on None
+                (so we can check our options, in case they've been changed).  If we still have
+                input available to process right now in 'source', we'll just check (0 timeout);
+                otherwise, use the specified server.control.latency."""
+                msg		= None
+                while msg is None and not stats.eof:
+                    wait=( kwds['server']['control']['latency']
+                           if source.peek() is None else 0 )
+                    brx = cpppo.timer()
+                    msg	= network.recv( conn, timeout=wait )
+                    now = cpppo.timer()
+                    log.detail( "Transaction receive after %7.3fs (%5s bytes in %7.3f/%7.3fs)" % (
+                        now - begun, len( msg ) if msg is not None else "None",
+                        now - brx, wait ))
+
+                    # After each block of input (or None), check if the server is being
+                    # signalled done/disabled; we need to shut down so signal eof.  Assumes
+                    # that (shared) server.control.{done,disable} dotdict be in kwds.  We do
+                    # *not* read using attributes here, to avoid reporting completion to
+                    # external APIs (eg. web) awaiting reception of these signals.
+                    if kwds['server']['control']['done'] or kwds['server']['control']['disable']:
+                        log.detail( "%s done, due to server done/disable", 
+                                    enip_mesg.name_centered() )
+                        stats['eof']	= True
+                    if msg is not None:
+                        stats['received']+= len( msg )
+                        stats['eof']	= stats['eof'] or not len( msg )
+                        log.detail( "%s recv: %5d: %s", enip_mesg.name_centered(),
+                                    len( msg ) if msg is not None else 0, cpppo.reprlib.repr( msg ))
+                        source.chain( msg )
+                    else:
+                        # No input.  If we have symbols available, no problem; continue.
+                        # This can occur if the state machine cannot make a transition on
+                        # the input symbol, indicating an unacceptable sentence for the
+                        # grammar.  If it cannot make progress, the machine will terminate
+                        # in a non-terminal state, rejecting the sentence.
+                        if source.peek() is not None:
+                            break
+                        # We're at a None (can't proceed), and no input is available.  This
+                        # is where we implement "Blocking"; just loop.
+
             while not stats.eof:
                 data		= cpppo.dotdict()
 
@@ -599,49 +644,18 @@ def enip_srv( conn, addr, enip_process=None, delay=None, **kwds ):
                 # Exception (dfa exits in non-terminal state).  Build data.request.enip:
                 begun		= cpppo.timer()
                 log.detail( "Transaction begins" )
-                for mch,sta in enip_mesg.run( path='request', source=source, data=data ):
-                    if sta is None:
-                        # No more transitions available.  Wait for input.  EOF (b'') will lead to
-                        # termination.  We will simulate non-blocking by looping on None (so we can
-                        # check our options, in case they've been changed).  If we still have input
-                        # available to process right now in 'source', we'll just check (0 timeout);
-                        # otherwise, use the specified server.control.latency.
-                        msg	= None
-                        while msg is None and not stats.eof:
-                            wait=( kwds['server']['control']['latency']
-                                   if source.peek() is None else 0 )
-                            brx = cpppo.timer()
-                            msg	= network.recv( conn, timeout=wait )
-                            now = cpppo.timer()
-                            log.detail( "Transaction receive after %7.3fs (%5s bytes in %7.3f/%7.3fs)" % (
-                                now - begun, len( msg ) if msg is not None else "None",
-                                now - brx, wait ))
-
-                            # After each block of input (or None), check if the server is being
-                            # signalled done/disabled; we need to shut down so signal eof.  Assumes
-                            # that (shared) server.control.{done,disable} dotdict be in kwds.  We do
-                            # *not* read using attributes here, to avoid reporting completion to
-                            # external APIs (eg. web) awaiting reception of these signals.
-                            if kwds['server']['control']['done'] or kwds['server']['control']['disable']:
-                                log.detail( "%s done, due to server done/disable", 
-                                            enip_mesg.name_centered() )
-                                stats['eof']	= True
-                            if msg is not None:
-                                stats['received']+= len( msg )
-                                stats['eof']	= stats['eof'] or not len( msg )
-                                log.detail( "%s recv: %5d: %s", enip_mesg.name_centered(),
-                                            len( msg ) if msg is not None else 0, cpppo.reprlib.repr( msg ))
-                                source.chain( msg )
-                            else:
-                                # No input.  If we have symbols available, no problem; continue.
-                                # This can occur if the state machine cannot make a transition on
-                                # the input symbol, indicating an unacceptable sentence for the
-                                # grammar.  If it cannot make progress, the machine will terminate
-                                # in a non-terminal state, rejecting the sentence.
-                                if source.peek() is not None:
-                                    break
-                                # We're at a None (can't proceed), and no input is available.  This
-                                # is where we implement "Blocking"; just loop.
+
+                # Frame a complete EtherNet/IP message already buffered (eg. pipelined requests)
+                # directly, receiving some input first if none is available.  Otherwise (a partial
+                # message, or EOF), fall back to the framing state machine, which awaits the
+                # remainder of the message.  Only non-transitions awaiting more input are surfaced
+                # by run_buffer.
+                if source.peek() is None:
+                    receive()
+                if not parser.enip_frame( source, data, path='request' ):
+                    for mch,sta in enip_mesg.run_buffer( path='request', source=source, data=data ):
+                        if sta is None:
+                            receive()
 
                 log.detail( "Transaction parsed  after %7.3fs" % ( cpppo.timer() - begun ))
                 # Terminal state and EtherNet/IP header recognized, or clean EOF (no partial
@@ -663,9 +677,10 @@ def enip_srv( conn, addr, enip_process=None, delay=None, **kwds ):
                             log.warning( "Expected EtherNet/IP response encapsulated message; none found" )
                             assert data.response.enip.status, "If no/empty response payload, expected non-zero EtherNet/IP status"
 
-                        rpy	= parser.enip_encode( data.response.enip )
+                        # The response payload is sent without copying it into a single message
+                        rpy	= parser.enip_encode_buffers( data.response.enip )
                         log.detail( "%s send: %5d: %s %s", enip_mesg.name_centered(),
-                                    len( rpy ), cpppo.reprlib.repr( rpy ),
+                                    sum( len( buf ) for buf in rpy ), cpppo.reprlib.repr( rpy ),
                                     ("delay: %r" % delay) if delay else "" )
                         if delay:
                             # A delay (anything with a delay.value attribute) == #[.#] (converible
@@ -677,7 +692,7 @@ def enip_srv( conn, addr, enip_process=None, delay=None, **kwds ):
                             except Exception as exc:
                                 log.detail( "Unable to delay; invalid seconds: %r", delay )
                         try:
-                            conn.send( rpy )
+                            network.sendmsg( conn, rpy )
                         except socket.error as exc:
                             log.detail( "Session ended (client abandoned): %s", exc )
                             stats['eof'] = True
@@ -701,9 +716,9 @@ def enip_srv( conn, addr, enip_process=None, delay=None, **kwds ):
         except:
             # Parsing failure.  We're done.  Suck out some remaining input to give us some context.
             stats['processed']	= source.sent
-            memory		= bytes(bytearray(source.memory))
-            pos			= len( source.memory )
-            future		= bytes(bytearray( b for b in source ))
+            memory		= source.memory.tobytes()
+            pos			= len( memory )
+            future		= source.remaining.tobytes()
             where		= "at %d total bytes:\n%s\n%s (byte %d)" % (
                 stats.processed, repr(memory+future), '-' * (len(repr(memory))-1) + '^', pos )
             log.error( "EtherNet/IP error %s\n\nFailed with exception:\n%s\n", where,
@@ -45,6 +45,8 @@ log				= logging.getLogger( "enip.srv" )
 # octets	-- Scans octets to <context>.input array
 # octets_encode	--   and converts array of octets back to a bytes string
 # octets_struct	-- Scans octets sufficient to fulfill struct 'format', and parses
+# octets_fields	-- Scans octets sufficient to fulfill struct 'format', and parses all its fields
+# octets_bulk	-- Scans a (data-specified) number of octets into <context>.input all at once
 # words_base	-- A dfa_base that default to scan octet pairs (words) from bytes data
 # words		-- Scands words into <context>.input array
 # 
@@ -69,7 +71,34 @@ class octets_base( cpppo.dfa_base ):
         super( octets_base, self ).__init__( name=name, initial=octets_state(
             name=octets_name, terminal=True, alphabet=octets_alphabet, encoder=octets_encoder,
             typecode=octets_typecode, extension=octets_extension ), **kwds )
-   
+
+    def generate( self, gen, path=None ):
+        """Emit source to scan all 'repeat' octets at once, instead of one per sub-machine cycle."""
+        if ( self.limit is not None or not gen.plain( self )
+             or type( self.initial ) not in ( cpppo.state, cpppo.state_input, cpppo.state_drop )
+             or not gen.plain( self.initial, type( self.initial ))):
+            return super( octets_base, self ).generate( gen, path=path )
+        if type( self.initial ) is cpppo.state:
+            return
+        count			= gen.count( self, path=path )
+        gen.need( count )
+        if type( self.initial ) is cpppo.state_input:
+            if isinstance( self.repeat, cpppo.type_str_base ):
+                gen.emit( "if %s:" % count )
+                gen.depth      += 1
+            ours		= self.initial.context( path=self.context( path ))
+            gen.emit( "val = array.array( %r, bytes( buf[offset:offset+%s] ))" % (
+                self.initial.typecode, count ))
+            gen.emit( "try:" )
+            gen.emit( "    data[%r].extend( val )" % ours )
+            gen.emit( "except KeyError:" )
+            gen.emit( "    data[%r] = val" % ours )
+            gen.emit( "offset += %s" % count )
+            if isinstance( self.repeat, cpppo.type_str_base ):
+                gen.depth      -= 1
+        else:
+            gen.emit( "offset += %s" % count )
+
 
 class octets( octets_base, cpppo.state ):
     """Scans 'repeat' octets into <context>.input using a state_input sub-machine (by default), but
@@ -78,8 +107,12 @@ class octets( octets_base, cpppo.state ):
 
 
 def octets_encode( value ):
-    if isinstance( value, array.array ):
+    if isinstance( value, bytes ):
+        return value
+    elif isinstance( value, array.array ):
         return value.tostring() if sys.version_info[0] < 3 else value.tobytes()
+    elif isinstance( value, memoryview ):
+        return value.tobytes()
     elif isinstance( value, bytearray ):
         return bytes( value )
     raise AssertionError( "Unrecognized octets type: %r" % value )
@@ -95,6 +128,104 @@ class octets_struct( octets_base, cpppo.state_struct ):
             repeat=struct.calcsize( self.struct_format if format is None else format ),
                                                **kwds )
 
+    def generate( self, gen, path=None ):
+        """Emit source to unpack our struct value directly from the input."""
+        if self.limit is not None or not gen.plain( self, cpppo.state_struct ):
+            raise cpppo.NotGenerable( "%s: no generated equivalent of %s" % (
+                self.name_centered(), self.__class__.__name__ ))
+        ours			= self.context( path=path )
+        gen.need( self.repeat )
+        gen.emit( "val = %s.unpack_from( buf, offset + %d )[0]" % (
+            gen.constant( self._struct ), self.offset + self.index * self.struct_calcsize ))
+        gen.emit( "try:" )
+        gen.emit( "    data[%r].append( val )" % ours )
+        gen.emit( "except (AttributeError, KeyError):" )
+        gen.emit( "    data[%r] = val" % ours )
+        gen.emit( "offset += %d" % self.repeat )
+
+
+class octets_fields( octets_struct ):
+    """Scans octets sufficient to satisfy a fixed-layout struct 'format' of several fields (eg. '<HHII8sI'),
+    and then decodes every field at once with a single struct unpack, into <path>[.<context>].<field>
+    for each of the supplied 'fields' names.  This replaces a chain of (eg. UINT, UDINT, ...) states,
+    each collecting and decoding its own value.
+
+    Any string (eg. '8s') field is stored (as an octets state would) in <field>.input.  The raw
+    octets are collected into a temporary <path>[.<context>].fields__, and discarded once decoded.
+
+    """
+    def __init__( self, name=None, format=None, fields=None, **kwds ):
+        assert format is not None and fields is not None, \
+            "Must supply the struct 'format' and a name for each of its fields"
+        kwds.setdefault( 'octets_extension', '.fields__' )
+        kwds.setdefault( 'input_extension', kwds['octets_extension'] )
+        super( octets_fields, self ).__init__( name=name, format=format, **kwds )
+        self.fields		= tuple( fields )
+        self._keys		= {}	# { <context>: (<key>, ...) }, computed by keys_for
+        assert len( self.fields ) == len( self._struct.unpack_from( bytearray( self.struct_calcsize ))), \
+            "Must supply a name for each of the %r struct format's fields: %r" % ( format, fields )
+
+    def keys_for( self, ours ):
+        """The (interned) data artifact key of each field (<field>.input, for string fields), at our
+        context ours; computed once for each context."""
+        try:
+            return self._keys[ours]
+        except KeyError:
+            pass
+        dot			= '.' if ours else ''
+        zero			= self._struct.unpack_from( bytearray( self.struct_calcsize ))
+        keys			= tuple(
+            cpppo.path_intern( ours + dot + field + ( '.input' if isinstance( val, bytes ) else '' ))
+            for field,val in zip( self.fields, zero ))
+        if len( self._keys ) >= self.contexts_limit:
+            self._keys.clear()
+        self._keys[ours]	= keys
+        return keys
+
+    def terminate( self, exception, machine=None, path=None, data=None ):
+        """Decode all the fields from the collected octets, and store them.  As for a state_struct, a
+        value is appended to an existing target (eg. a list); otherwise, it is assigned."""
+        # Skip state_struct's decoding of a single value
+        super( cpppo.state_struct, self ).terminate( exception, machine=machine, path=path, data=data )
+        if exception is not None:
+            return
+        ours			= self.context( path=path )
+        buf			= data.pop( self.context( path, self._input_ext ))
+        vals			= self._struct.unpack_from( buffer=buf )
+        for key,val in zip( self.keys_for( ours ), vals ):
+            if isinstance( val, bytes ):
+                data[key]	= array.array( cpppo.type_bytes_array_symbol, val )
+                continue
+            try:
+                data[key].append( val )
+            except (AttributeError, KeyError):
+                data[key]	= val
+        if cpppo.automata.trace is not None:
+            cpppo.automata.trace( 'fields', machine=machine, state=self, path=ours,
+                                  value=dict( zip( self.fields, vals )), format=self._struct.format )
+
+    def generate( self, gen, path=None ):
+        """Emit source to unpack all our fields directly from the input."""
+        if self.limit is not None or not gen.plain( self, octets_fields ):
+            raise cpppo.NotGenerable( "%s: no generated equivalent of %s" % (
+                self.name_centered(), self.__class__.__name__ ))
+        ours			= self.context( path=path )
+        dot			= '.' if ours else ''
+        zero			= self._struct.unpack_from( bytearray( self.struct_calcsize ))
+        vals			= gen.local()
+        gen.need( self.struct_calcsize )
+        gen.emit( "%s = %s.unpack_from( buf, offset )" % ( vals, gen.constant( self._struct )))
+        for i,(field,val) in enumerate( zip( self.fields, zero )):
+            if isinstance( val, bytes ):
+                gen.emit( "data[%r] = array.array( %r, %s[%d] )" % (
+                    ours+dot+field+'.input', cpppo.type_bytes_array_symbol, vals, i ))
+                continue
+            gen.emit( "try:" )
+            gen.emit( "    data[%r].append( %s[%d] )" % ( ours+dot+field, vals, i ))
+            gen.emit( "except (AttributeError, KeyError):" )
+            gen.emit( "    data[%r] = %s[%d]" % ( ours+dot+field, vals, i ))
+        gen.emit( "offset += %d" % self.struct_calcsize )
+
 
 class octets_noop( octets_base, cpppo.state ):
     """Does nothing with an octet."""
@@ -108,7 +239,97 @@ class octets_drop( octets_base, cpppo.state ):
     def __init__( self, name=None, octets_state=cpppo.state_drop, **kwds ):
         super( octets_drop, self ).__init__(
             name=name, octets_name="drop", octets_state=octets_state, **kwds )
-        
+
+
+class octets_bulk( cpppo.state ):
+    """Scans 'repeat' octets (an int, or the path of an int in the data artifact, relative to path;
+    default: 0) into <context>.input, taking each contiguous run of available input in one slice,
+    rather than cycling a single octet state once per octet.  Like an octets, the target is an
+    array.array (created if necessary), so the result may be used exactly as an octets' .input.
+
+    If insufficient input is available, yields non-transitions 'til it is, just as an octets would.
+
+    """
+    def __init__( self, name=None, repeat=None, **kwds ):
+        name			= name or kwds.setdefault( 'context', self.__class__.__name__ )
+        kwds.setdefault( 'extension', cpppo.path_ext_input )
+        kwds.setdefault( 'typecode', cpppo.type_bytes_array_symbol )
+        assert isinstance( repeat, (cpppo.type_str_base, int, type(None)))
+        super( octets_bulk, self ).__init__( name, **kwds )
+        self.repeat		= repeat
+
+    def count( self, path=None, data=None ):
+        """The number of octets to scan."""
+        if isinstance( self.repeat, cpppo.type_str_base ):
+            return data.get( self.context( path, self.repeat ), 0 )
+        return self.repeat or 0
+
+    def delegate( self, source, machine=None, path=None, data=None, ending=None ):
+        remains			= self.count( path=path, data=data )
+        assert isinstance( remains, int ), \
+            "Supplied repeat=%r must be (or reference) an int, not a %r" % ( self.repeat, remains )
+        if not remains:
+            return
+        ours			= self.context( path=path )
+        try:
+            thing		= data[ours]
+        except KeyError:
+            thing = data[ours]	= array.array( self.typecode )
+        take			= getattr( source, 'take', None )
+        while remains:
+            # Never consume beyond any ending symbol established by an enclosing limit
+            avail		= remains if ending is None else min( remains, ending - source.sent )
+            if avail <= 0:
+                if cpppo.automata.trace is not None:
+                    cpppo.automata.trace( 'limited', machine=machine, state=self, sent=source.sent,
+                                          ending=ending )
+                raise cpppo.NonTerminal( "%s limited to %d octets, with %d remaining" % (
+                    self.name_centered(), ending, remains ))
+            if take is None:
+                inp		= next( source, None )
+                if inp is not None:
+                    thing.append( inp )
+                    remains    -= 1
+                    continue
+            else:
+                # Release the view over the source's buffer before yielding, so it may be resized
+                chunk		= take( avail )
+                taken		= len( chunk )
+                if taken:
+                    if sys.version_info[0] < 3:
+                        thing.fromstring( chunk.tobytes() )
+                    else:
+                        thing.frombytes( chunk )
+                    remains    -= taken
+                del chunk
+                if taken:
+                    continue
+            # No input available; the caller must supply more, or discard us
+            yield machine,None
+        if cpppo.automata.trace is not None:
+            cpppo.automata.trace( 'input', machine=machine, state=self, path=ours,
+                                  value=len( thing ), sent=source.sent )
+
+    def generate( self, gen, path=None ):
+        """Emit source to scan all 'repeat' octets in one slice."""
+        if self.limit is not None or not gen.plain( self ):
+            raise cpppo.NotGenerable( "%s: no generated equivalent of %s" % (
+                self.name_centered(), self.__class__.__name__ ))
+        ours			= self.context( path=path )
+        count			= gen.local( '_n' )
+        if isinstance( self.repeat, cpppo.type_str_base ):
+            gen.emit( "%s = data.get( %r, 0 )" % ( count, self.context( path, self.repeat )))
+        else:
+            gen.emit( "%s = %d" % ( count, self.repeat or 0 ))
+        gen.need( count )
+        gen.emit( "if %s:" % count )
+        gen.emit( "    val = array.array( %r, bytes( buf[offset:offset+%s] ))" % ( self.typecode, count ))
+        gen.emit( "    try:" )
+        gen.emit( "        data[%r].extend( val )" % ours )
+        gen.emit( "    except KeyError:" )
+        gen.emit( "        data[%r] = val" % ours )
+        gen.emit( "    offset += %s" % count )
+
 
 class words_base( cpppo.dfa_base ):
     """Scan 'repeat' 2-byte words (default: 1), convenient when sizes are specified in words."""
@@ -263,6 +484,7 @@ class SSTRING( STRUCT ):
 # 
 # enip_header	-- Parse an EtherNet/IP header only 
 # enip_machine	-- Parses an EtherNet/IP header and encapsulated data payload
+# enip_frame	--   or frames a complete, buffered EtherNet/IP message directly
 # enip_encode	--   and convert parsed EtherNet/IP data back into a message
 # 
 class enip_header( cpppo.dfa ):
@@ -280,7 +502,7 @@ class enip_header( cpppo.dfa ):
 
     Does *not* scan the command-specific data which (normally) follows the header.
 
-    Each protocol element transitions to the next required element on any (non-None) symbol; we
+    The fixed-layout header is collected and decoded in one operation, on any (non-None) symbol; we
     don't use None (no-input) transition, because we don't want to skip thru the state machine
     when no input is available.
 
@@ -288,13 +510,9 @@ class enip_header( cpppo.dfa ):
     def __init__( self, name=None, **kwds ):
         name 			= name or kwds.setdefault( 'context', 'header' )
         init			= cpppo.state(  "empty",  terminal=True )
-        init[True] = cmnd	= UINT(		"command",	context="command" )
-        cmnd[True] = leng	= UINT(		"length",	context="length" )
-        leng[True] = sess	= UDINT(	"sess_hdl",	context="session_handle" )
-        sess[True] = stat	= UDINT(	"status",	context="status" )
-        stat[True] = ctxt	= octets(	"sndr_ctx",	context="sender_context",
-                                    repeat=8 )
-        ctxt[True] 		= UDINT( 	"options",	context="options", terminal=True )
+        init[True] 		= octets_fields( "fields",	format='<HHII8sI',
+                                    fields=( 'command', 'length', 'session_handle', 'status',
+                                             'sender_context', 'options' ), terminal=True )
 
         super( enip_header, self ).__init__( name=name, initial=init, **kwds )
 
@@ -314,12 +532,70 @@ class enip_machine( cpppo.dfa ):
     def __init__( self, name=None, **kwds ):
         name 			= name or kwds.setdefault( 'context', 'enip' )
         hedr			= enip_header(	'header' ) # NOT in a separate context!
-        hedr[None]		= octets(	'payload',
+        hedr[None]		= octets_bulk(	'payload',
                                                 repeat=".length",
                                                 terminal=True )
 
         super( enip_machine, self ).__init__( name=name, initial=hedr, **kwds )
 
+enip_header_struct		= struct.Struct( '<HHII8sI' )
+
+def enip_frame( source, data, path=None, context='enip' ):
+    """Frames one complete EtherNet/IP message directly from the input already buffered in source (a
+    cpppo.buffering), without running a state machine: the 24-byte encapsulation header is decoded
+    with a single struct unpack, and exactly its .length octets of payload are sliced out, into the
+    same <path>.<context>... keys as enip_machine.  Returns True iff a complete frame was consumed.
+
+    If a complete frame isn't (yet) buffered, or the source isn't a buffering, nothing is consumed
+    and False is returned; the caller must then fall back to an enip_machine, which will consume
+    any partial frame, await the remainder (or EOF), and diagnose any failure.
+
+    """
+    buf				= getattr( source, 'buffer', None )
+    if buf is None:
+        return False
+    pos				= source.offset
+    if len( buf ) - pos < enip_header_struct.size:
+        return False
+    command,length,session_handle,status,sender_context,options \
+				= enip_header_struct.unpack_from( buf, pos )
+    if len( buf ) - pos - enip_header_struct.size < length:
+        return False
+    ours			= '.'.join( p for p in ( path, context ) if p )
+    dot				= '.' if ours else ''
+    data[ours+dot+'command']	= command
+    data[ours+dot+'length']	= length
+    data[ours+dot+'session_handle'] = session_handle
+    data[ours+dot+'status']	= status
+    data[ours+dot+'sender_context.input'] = array.array( cpppo.type_bytes_array_symbol, sender_context )
+    data[ours+dot+'options']	= options
+    source.take( enip_header_struct.size )
+    if length:
+        payload			= array.array( cpppo.type_bytes_array_symbol )
+        chunk			= source.take( length )
+        if sys.version_info[0] < 3:
+            payload.fromstring( chunk.tobytes() )
+        else:
+            payload.frombytes( chunk )
+        del chunk
+        data[ours+dot+'input']	= payload
+    return True
+
+def enip_encode_buffers( data ):
+    """Produce the buffers of an encoded EtherNet/IP message from the supplied data, as for
+    enip_encode: the (newly encoded) header, and (unless empty) the encapsulated data.input itself,
+    without copying it.  Suitable for sending by scatter/gather I/O (eg. network.sendmsg), or for
+    joining.  Under Python2, the payload must be converted (copied) to a str, to be joinable.
+
+    """
+    payload			= data.input if 'input' in data else b''
+    header			= enip_header_struct.pack(
+        data.command, len( payload ), data.session_handle, data.status,
+        octets_encode( data.sender_context.input ), data.options )
+    if not len( payload ):
+        return [ header ]
+    return [ header, octets_encode( payload ) if sys.version_info[0] < 3 else payload ]
+
 def enip_encode( data ):
     """Produce an encoded EtherNet/IP message from the supplied data; assumes any encapsulated data has
     been encoded to enip.input and is already available.  Assumes a data artifact is supplied like
@@ -328,16 +604,7 @@ def enip_encode( data ):
     don't check here.
 
     """
-    result			= b''.join([
-        UINT.produce(	data.command ),
-        UINT.produce( len(data.input ) if 'input' in data else 0 ),
-        UDINT.produce(	data.session_handle ),
-        UDINT.produce(	data.status ),
-        octets_encode(	data.sender_context.input ),
-        UDINT.produce(	data.options ),
-        octets_encode(	data.input ) if 'input' in data else b'',
-    ])
-    return result
+    return b''.join( enip_encode_buffers( data ))
     
 def enip_format( data, sort_keys=False ):
     """Format a decoded EtherNet/IP data bundle in a (more) human-readable form.  Note that sort_keys=True
@@ -350,7 +617,8 @@ def enip_format( data, sort_keys=False ):
     will probably be unexpected.  There is no means by which to specify a custom sorting function.
 
     """
-    return json.dumps( data, indent=4, sort_keys=sort_keys, default=lambda obj: repr( obj ))
+    return json.dumps( data, indent=4, sort_keys=sort_keys,
+                       default=lambda obj: dict( obj.items() ) if isinstance( obj, cpppo.record ) else repr( obj ))
 
 # 
 # EtherNet/IP CIP Parsing
@@ -370,12 +638,18 @@ class move_if( cpppo.decide ):
         self.src		= source
         self.dst		= destination if destination else ''
         self.ini		= initializer
-        
+        self.paths		= {}	# { <path>: (<pathsrc>, <pathdst>) }
+
     def execute( self, truth, machine=None, source=None, path=None, data=None ):
         target			= super( move_if, self ).execute(
             truth, machine=machine, source=source, path=path, data=data )
         if truth:
-            pathdst		= path + self.dst
+            try:
+                pathsrc,pathdst	= self.paths[path]
+            except KeyError:
+                pathsrc,pathdst	= self.paths.setdefault( path, (
+                    None if self.src is None else cpppo.path_intern( path + self.src ),
+                    cpppo.path_intern( path + self.dst )))
             if self.ini is not None and pathdst not in data:
                 ini		= ( self.ini
                                     if not hasattr( self.ini, '__call__' )
@@ -386,7 +660,6 @@ class move_if( cpppo.decide ):
                 finally:
                     log.debug( "%s -- init. data[%r] to %r in data: %s", self, pathdst, ini, data )
             if self.src is not None:
-                pathsrc		= path + self.src
                 assert pathsrc in data, \
                     "Could not find %r to move to %r in %r" % ( pathsrc, pathdst, data )
                 if hasattr( data[pathdst], 'append' ):
@@ -480,6 +753,7 @@ class EPATH( cpppo.dfa ):
         'element':	0x28,
         'port':		0x00,
     }
+    CACHE			= cpppo.bounded_cache( 1024 ) # { (<cls>, <segments>): <encoding> }
     def __init__( self, name=None, **kwds ):
         name 			= name or kwds.setdefault( 'context', self.__class__.__name__ )
 
@@ -679,74 +953,95 @@ class EPATH( cpppo.dfa ):
     
         Optionally pad the size (eg. for Route Paths).
 
+        The encoding of the segments (excluding any final element segment, which usually varies
+        between otherwise identical paths, eg. 'SCADA[123]') is cached, so frequently used paths are
+        encoded only once.
+
         """
-        
+        segments		= data.segment
+        element			= b''
+        if segments and len( segments[-1] ) == 1 and 'element' in segments[-1]:
+            element		= cls.produce_segment( segments[-1] )
+            segments		= segments[:-1]
+        try:
+            key			= ( cls, tuple( tuple( sorted( seg.items() )) for seg in segments ))
+            result		= cls.CACHE.get( key )
+        except TypeError: # unhashable segment value; not cacheable
+            key = result	= None
+        if result is None:
+            result		= b''.join( cls.produce_segment( seg ) for seg in segments )
+            if key is not None:
+                cls.CACHE[key]	= result
+        result		       += element
+        return USINT.produce( len( result ) // 2 ) + ( b'\x00' if cls.PADSIZE else b'' ) + result
+
+    @classmethod
+    def produce_segment( cls, seg ):
+        """Produce the encoding of a single EPATH segment."""
         result			= b''
-        for seg in data.segment:
-            found			= False
-            for segnam, segtyp in cls.SEGMENTS.items():
-                if segnam not in seg:
-                    continue
-                found		= True
-                segval		= seg[segnam]
-                # An ANSI Extended Symbolic segment?
-                if segnam == 'symbolic':
-                    result     += USINT.produce( segtyp )
-                    encoded     = segval.encode( 'iso-8859-1' )
-                    seglen	= len( encoded )
-                    result     += USINT.produce( seglen )
-                    result     += encoded
-                    if seglen % 2:
-                        result += USINT.produce( 0 )
-                    break
-                
-                # A Port/Link segment?
-                if segnam == 'port':
-                    assert 'link' in seg, \
-                        "A path port segment requires a link #/address: %s" % ( seg )
-                    port, pext	= (seg.port, 0) if seg.port < 0x0F else (0x0F, seg.port)
-                    assert isinstance( seg.link, ( int, cpppo.type_str_base )), \
-                        "A path port link must be either an integer or a address string: % ( seg )"
-                    if type( seg.link ) is int:
-                        # 0x0_ port, optional extended port#, int link
-                        result += USINT.produce( port )
-                        if pext:
-                            result += UINT.produce( pext )
-                        result += USINT.produce( seg.link )
-                    else:
-                        # 0x1_ port, link size, optional extended port, link string, optional pad
-                        result += USINT.produce( port | 0x10 )
-                        encoded	= seg.link.encode( 'iso-8859-1' )
-                        result += USINT.produce( len( encoded ))
-                        if pext:
-                            result += UINT.produce( pext )
-                        result += encoded
-                        if len( encoded ) % 2:
-                            result += b'\00'
-                    break
-
-                # A numeric path segment; class, instance/connection, attribute, element:
-                if segval <= 0xff:
-                    result     += USINT.produce( segtyp )
-                    result     += USINT.produce( segval )
-                elif segval <= 0xffff:
-                    result     += USINT.produce( segtyp + 1 )
-                    result     += USINT.produce( 0 )
-                    result     += UINT.produce( segval )
-                elif segval <= 0xffffffff and segnam == 'element':
-                    result     += USINT.produce( segtyp + 2 )
-                    result     += USINT.produce( 0 )
-                    result     += UDINT.produce( segval )
+        found			= False
+        for segnam, segtyp in cls.SEGMENTS.items():
+            if segnam not in seg:
+                continue
+            found		= True
+            segval		= seg[segnam]
+            # An ANSI Extended Symbolic segment?
+            if segnam == 'symbolic':
+                result     += USINT.produce( segtyp )
+                encoded     = segval.encode( 'iso-8859-1' )
+                seglen	= len( encoded )
+                result     += USINT.produce( seglen )
+                result     += encoded
+                if seglen % 2:
+                    result += USINT.produce( 0 )
+                break
+            
+            # A Port/Link segment?
+            if segnam == 'port':
+                assert 'link' in seg, \
+                    "A path port segment requires a link #/address: %s" % ( seg )
+                port, pext	= (seg.port, 0) if seg.port < 0x0F else (0x0F, seg.port)
+                assert isinstance( seg.link, ( int, cpppo.type_str_base )), \
+                    "A path port link must be either an integer or a address string: % ( seg )"
+                if type( seg.link ) is int:
+                    # 0x0_ port, optional extended port#, int link
+                    result += USINT.produce( port )
+                    if pext:
+                        result += UINT.produce( pext )
+                    result += USINT.produce( seg.link )
                 else:
-                    assert False, "Invalid value for numeric EPATH segment %r == %d: %d" % (
-                        segnam, segval, data )
+                    # 0x1_ port, link size, optional extended port, link string, optional pad
+                    result += USINT.produce( port | 0x10 )
+                    encoded	= seg.link.encode( 'iso-8859-1' )
+                    result += USINT.produce( len( encoded ))
+                    if pext:
+                        result += UINT.produce( pext )
+                    result += encoded
+                    if len( encoded ) % 2:
+                        result += b'\00'
                 break
-            if not found:
-                assert False, "Invalid EPATH segment %r found in %r" % ( segnam, data )
-            assert len( result ) % 2 == 0, \
-                "Failed to retain even EPATH word length after %r in %r" % ( segnam, data )
-    
-        return USINT.produce( len( result ) // 2 ) + ( b'\x00' if cls.PADSIZE else b'' ) + result
+
+            # A numeric path segment; class, instance/connection, attribute, element:
+            if segval <= 0xff:
+                result     += USINT.produce( segtyp )
+                result     += USINT.produce( segval )
+            elif segval <= 0xffff:
+                result     += USINT.produce( segtyp + 1 )
+                result     += USINT.produce( 0 )
+                result     += UINT.produce( segval )
+            elif segval <= 0xffffffff and segnam == 'element':
+                result     += USINT.produce( segtyp + 2 )
+                result     += USINT.produce( 0 )
+                result     += UDINT.produce( segval )
+            else:
+                assert False, "Invalid value for numeric EPATH segment %r == %d: %r" % (
+                    segnam, segval, seg )
+            break
+        if not found:
+            assert False, "Invalid EPATH segment found in %r" % ( seg )
+        assert len( result ) % 2 == 0, \
+            "Failed to retain even EPATH word length after %r in %r" % ( segnam, seg )
+        return result
 
 
 class route_path( EPATH ):
@@ -793,10 +1088,9 @@ class unconnected_send( cpppo.dfa ):
         usnd[True]	= path	= EPATH(	context='path' )
         # All Unconnected Send (0x52) encapsulated request.input have a length, followed by an
         # optional pad, and then a route path.
-        path[True]	= prio	= USINT(	context='priority' )
-        prio[True]	= timo	= USINT(	context='timeout_ticks' )
-        timo[True]	= leng	= UINT(		context='length' )
-        leng[None]	= mesg	= octets( 	context='request', repeat='..length' )
+        path[True]	= leng	= octets_fields( 'prio_leng',	format='<BBH',
+                                    fields=( 'priority', 'timeout_ticks', 'length' ))
+        leng[None]	= mesg	= octets_bulk(	context='request', repeat='..length' )
 
         # Route segments, like path but for hops/links/keys...
         rout			= route_path( terminal=True )
@@ -863,8 +1157,8 @@ class communications_service( cpppo.dfa ):
     def __init__( self, name=None, **kwds ):
         name 			= name or kwds.setdefault( 'context', self.__class__.__name__ )
         
-        vers			= UINT(	context='version' )
-        vers[True]	= capa	= UINT(	context='capability' )
+        capa			= octets_fields( 'vers_capa',	format='<HH',
+                                    fields=( 'version', 'capability' ))
 
         capa[True]	= svnm	= cpppo.string_bytes( 'service_name',
                                         context='service_name', greedy=True,
@@ -878,7 +1172,7 @@ class communications_service( cpppo.dfa ):
         svnm[True]	= svnm
         '''
 
-        super( communications_service, self ).__init__( name=name, initial=vers, **kwds )
+        super( communications_service, self ).__init__( name=name, initial=capa, **kwds )
 
     @classmethod
     def produce( cls, data ):
@@ -937,29 +1231,27 @@ class CPF( cpppo.dfa ):
         name 			= name or kwds.setdefault( 'context', self.__class__.__name__ )
 
         # A number, and then each CPF item consistes of a type, length and then parsable data.  
-        ityp			= UINT( 			context='type_id' )
-        ityp[True]	= ilen	= UINT( 			context='length' )
+        ilen			= octets_fields( 'type_leng',	format='<HH',
+                                                 fields=( 'type_id', 'length' ))
         ilen[None]		= cpppo.decide( 'empty',
                                 predicate=lambda path=None, data=None, **kwds: not data[path].length,
                                                 state=octets_noop( 'done', terminal=True ))
 
-        # Prepare a parser for each recognized CPF item type.  It must establish one level of
-        # context, because we need to pass it a limit='..length' denoting the length we just parsed.
-        # Note that we must capture the value of 'typ' in the lambda definition as a keyword
-        # parameter (which is evaluated at once), or it will take the final value of outer 'typ'
-        for typ,cls in self.ITEM_PARSERS.items():
-            ilen[None]		= cpppo.decide( cls.__name__, state=cls( terminal=True, limit='..length' ),
-                        predicate=lambda path=None, data=None, typ=typ, **kwds: data[path].type_id == typ )
-
-        # If we don't recognize the CPF item type, just parse remainder into .input (so we could re-generate)
-        ilen[None]	= urec	= octets( 	'unrecognized',	context=None,
+        # Prepare a parser for each recognized CPF item type, selected by .type_id.  It must establish
+        # one level of context, because we need to pass it a limit='..length' denoting the length we
+        # just parsed.  If we don't recognize the CPF item type, just parse remainder into .input (so
+        # we could re-generate)
+        urec			= octets( 	'unrecognized',	context=None,
                                                 terminal=True )
         urec[True]		= urec
+        ilen[None]		= cpppo.switch(	'type_id', path='.type_id', default=urec,
+            cases=dict( (typ,cls( terminal=True, limit='..length' ))
+                        for typ,cls in self.ITEM_PARSERS.items() ))
 
         # Each item is collected into '.item__', 'til no more input available, and then moved into
         # place into '.item' (init to [])
         item			= cpppo.dfa( 	'each', 	context='item__',
-                                                initial=ityp )
+                                                initial=ilen )
         item[None] 		= move_if( 	'move', 	source='.item__',
                                            destination='.item', initializer=lambda **kwds: [] )
         item[None]		= cpppo.state( 	'done', terminal=True )
@@ -976,22 +1268,21 @@ class CPF( cpppo.dfa ):
 
     @classmethod
     def produce( cls, data ):
-        """Regenerate a CPF message structure.   """
-        result			= b''
+        """Regenerate a CPF message structure, joining the encoded items once."""
         if not data:
-            return result # An empty CPF -- indicates no CPF segment present at all
-        result		       += UINT.produce( len( data.item ))
+            return b'' # An empty CPF -- indicates no CPF segment present at all
+        result			= [ UINT.produce( len( data.item )) ]
         for item in data.item:
-            result	       += UINT.produce( item.type_id )
+            result.append( UINT.produce( item.type_id ))
             if item.type_id in cls.ITEM_PARSERS:
                 itmprs		= cls.ITEM_PARSERS[item.type_id] # eg 'unconnected_send', 'communications_service'
                 item.input	= bytearray( itmprs.produce( item[itmprs.__name__] ))
             if 'input' in item:
-                result	       += UINT.produce( len( item.input ))
-                result	       += octets_encode( item.input )
+                result.append( UINT.produce( len( item.input )))
+                result.append( octets_encode( item.input ))
             else:
-                result	       += UINT.produce( 0 )
-        return result
+                result.append( UINT.produce( 0 ))
+        return b''.join( result )
 
 
 class send_data( cpppo.dfa ):
@@ -1007,11 +1298,11 @@ class send_data( cpppo.dfa ):
 
     @staticmethod
     def produce( data ):
-        result			= b''
-        result		       += UDINT.produce( data.interface )
-        result		       += UINT.produce(  data.timeout )
-        result		       += CPF.produce( data.CPF )
-        return result
+        return b''.join([
+            UDINT.produce(	data.interface ),
+            UINT.produce(	data.timeout ),
+            CPF.produce(	data.CPF ),
+        ])
 
 
 class register( cpppo.dfa ):
@@ -1123,10 +1414,12 @@ class CIP( cpppo.dfa ):
         name 			= name or kwds.setdefault( 'context', self.__class__.__name__ )
 
         slct			= octets_noop(	'select' )
-        for cmd,cls in self.COMMAND_PARSERS.items():
-            slct[None]		= cpppo.decide( cls.__name__,
-                    state=cls( limit='...length', terminal=True ),
-                    predicate=lambda path=None, data=None, cmd=cmd, **kwds: data[path+'..command'] in cmd )
+        cases			= {}
+        for cmds,cls in self.COMMAND_PARSERS.items():
+            parser		= cls( limit='...length', terminal=True )
+            for cmd in cmds:
+                cases[cmd]	= parser
+        slct[None]		= cpppo.switch(	'command', path='..command', cases=cases )
         super( CIP, self ).__init__( name=name, initial=slct, **kwds )
 
     @classmethod
@@ -1145,6 +1438,101 @@ class CIP( cpppo.dfa ):
                 return cmdcls.produce( data['CIP.' + cmdcls.__name__] )
         raise Exception( "Invalid CIP request/reply format: %r" % data )
 
+# 
+# enip_frame_record	-- A slotted record type for a parsed EtherNet/IP frame
+# 
+#     An alternative to a dotdict as the data artifact for parsing EtherNet/IP frames, using a slotted
+# record for each layer of the frame down to its CPF items (each record creating the record type of
+# its declared layers, as they are parsed).  Supply a record as the data artifact to enip_machine and
+# CIP exactly as a dotdict (as the client does, for each response received); all keys (declared or
+# not) are available via the same dotted keys and attributes, eg.
+# 'enip.CIP.send_data.CPF.item[1].unconnected_send.request'.
+# 
+enip_context_record		= cpppo.record_type( 'enip_context_record', ( 'input', ))
+unconnected_send_record		= cpppo.record_type( 'unconnected_send_record', (
+    'service', 'status', 'path', 'priority', 'timeout_ticks', 'length', 'request', 'route_path' ))
+CPF_item_record			= cpppo.record_type( 'CPF_item_record', (
+    'type_id', 'length', 'input', ( 'unconnected_send', unconnected_send_record ),
+    'communications_service' ))
+CPF_record			= cpppo.record_type( 'CPF_record', (
+    'count', 'item', ( 'item__', CPF_item_record )))
+send_data_record		= cpppo.record_type( 'send_data_record', (
+    'interface', 'timeout', ( 'CPF', CPF_record )))
+CIP_record			= cpppo.record_type( 'CIP_record', (
+    ( 'send_data', send_data_record ), 'register', 'unregister', 'list_services' ))
+enip_header_record		= cpppo.record_type( 'enip_header_record', (
+    'command', 'length', 'session_handle', 'status', ( 'sender_context', enip_context_record ),
+    'options', 'input', ( 'CIP', CIP_record )))
+enip_frame_record		= cpppo.record_type( 'enip_frame_record', (
+    ( 'enip', enip_header_record ), ))
+
+
+class typed_bulk( cpppo.state ):
+    """Scans all the available (up to any limit) CIP data elements of the struct 'format' (eg. '<i'),
+    decoding each contiguous run of complete elements with a single struct unpack, and appending them
+    to <context>.data (a list, created if necessary).  This replaces cycling a TYPE sub-machine (and
+    a move_if) once per element.
+
+    At least one element is scanned; while insufficient input is available to complete an element,
+    yields non-transitions 'til it is, just as a TYPE would.  Use a True transition back to itself
+    (on a terminal instance) to scan any further elements, as more input becomes available.
+
+    """
+    def __init__( self, name=None, format=None, **kwds ):
+        assert format, "Must supply the struct 'format' of a data element"
+        name			= name or kwds.setdefault( 'context', self.__class__.__name__ )
+        kwds.setdefault( 'extension', '.data' )
+        super( typed_bulk, self ).__init__( name, **kwds )
+        self.format		= format.lstrip( '<' )
+        self.calcsize		= struct.calcsize( '<' + self.format )
+
+    def delegate( self, source, machine=None, path=None, data=None, ending=None ):
+        ours			= self.context( path=path )
+        take			= getattr( source, 'take', None )
+        part			= bytearray()	# octets of elements not yet decoded
+        count			= 0
+        while True:
+            # Never consume beyond any ending symbol established by an enclosing limit
+            avail		= sys.maxsize if ending is None else ending - source.sent
+            taken		= 0
+            if avail > 0:
+                if take is None:
+                    inp		= next( source, None )
+                    if inp is not None:
+                        part.append( cpppo.type_bytes_ordinal( inp ))
+                        taken	= 1
+                else:
+                    # Release the view over the source's buffer before yielding, so it may be resized
+                    chunk	= take( avail )
+                    taken	= len( chunk )
+                    part       += chunk.tobytes() if sys.version_info[0] < 3 else chunk
+                    del chunk
+            whole		= len( part ) // self.calcsize
+            if whole:
+                values		= struct.unpack_from( '<%d%s' % ( whole, self.format ), bytes( part ))
+                del part[:whole * self.calcsize]
+                count	       += whole
+                try:
+                    data[ours].extend( values )
+                except KeyError:
+                    data[ours]	= list( values )
+            if taken:
+                continue
+            if count and not part:
+                break
+            if avail <= 0:
+                if cpppo.automata.trace is not None:
+                    cpppo.automata.trace( 'limited', machine=machine, state=self, sent=source.sent,
+                                          ending=ending )
+                raise cpppo.NonTerminal( "%s limited to %d octets, with %d octets of an element" % (
+                    self.name_centered(), ending, len( part )))
+            # No input available; the caller must supply more, or discard us
+            yield machine,None
+        if cpppo.automata.trace is not None:
+            cpppo.automata.trace( 'input', machine=machine, state=self, path=ours,
+                                  value=count, sent=source.sent )
+
+
 class typed_data( cpppo.dfa ):
     """Parses CIP typed data, of the form specified by the datatype (must be a relative path within
     the data artifact, or an integer data type).  Data elements are parsed 'til exhaustion of input, so the caller should
@@ -1166,6 +1554,8 @@ class typed_data( cpppo.dfa ):
     DWORD			= 0x00d3	# 4 byte (32-bit boolean array)
     LINT			= 0x00c5	# 8 byte
 
+    Each run of available elements is decoded (and produced) in bulk, with a single struct operation.
+
     """
     TYPES_SUPPORTED		= {
         SINT.tag_type:	SINT,
@@ -1182,78 +1572,21 @@ class typed_data( cpppo.dfa ):
         assert tag_type, "Must specify a numeric (or relative path to) the CIP data type; found: %r" % tag_type
 
         slct			= octets_noop(	'select' )
-        
-        i_8d			= octets_noop(	'end_8bit',
-                                                terminal=True )
-        i_8d[True]	= i_8p	= SINT()
-        i_8p[None]		= move_if( 	'mov_8bit',	source='.SINT', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=i_8d )
-
-        u_8d			= octets_noop(	'end_8bitu',
-                                                terminal=True )
-        u_8d[True]	= u_8p	= USINT()
-        u_8p[None]		= move_if( 	'mov_8bitu',	source='.USINT', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=u_8d )
 
-        i16d			= octets_noop(	'end16bit',
-                                                terminal=True )
-        i16d[True]	= i16p	= INT()
-        i16p[None]		= move_if( 	'mov16bit',	source='.INT', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=i16d )
+        # A (terminal) bulk decoder for each data type, scanning more elements as input arrives
+        cases			= {}
+        for typ in self.TYPES_SUPPORTED.values():
+            bulk		= typed_bulk( typ.__name__,	format=typ.struct_format,
+                                              terminal=True )
+            bulk[True]		= bulk
+            cases[typ.tag_type]	= bulk
 
-        u16d			= octets_noop(	'end16bitu',
-                                                terminal=True )
-        u16d[True]	= u16p	= UINT()
-        u16p[None]		= move_if( 	'mov16bitu',	source='.UINT', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=u16d )
+        # Select the parser by data type; the tag_type is either a path, or a constant data type
+        slct[None]		= cpppo.switch(	'type',
+            path=tag_type if isinstance( tag_type, cpppo.type_str_base ) else None,
+            value=None if isinstance( tag_type, cpppo.type_str_base ) else lambda **kwds: tag_type,
+            cases=cases )
 
-        i32d			= octets_noop(	'end32bit',
-                                                terminal=True )
-        i32d[True]	= i32p	= DINT()
-        i32p[None]		= move_if( 	'mov32bit',	source='.DINT', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=i32d )
-
-        u32d			= octets_noop(	'end32bitu',
-                                                terminal=True )
-        u32d[True]	= u32p	= UDINT()
-        u32p[None]		= move_if( 	'mov32bitu',	source='.UDINT', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=u32d )
-
-        fltd			= octets_noop(	'endfloat',
-                                                terminal=True )
-        fltd[True]	= fltp	= REAL()
-        fltp[None]		= move_if( 	'movfloat',	source='.REAL', 
-                                           destination='.data',	initializer=lambda **kwds: [],
-                                                state=fltd )
-
-        slct[None]		= cpppo.decide(	'SINT',	state=i_8p,
-            predicate=lambda path=None, data=None, **kwds: \
-                SINT.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        slct[None]		= cpppo.decide(	'USINT',state=u_8p,
-            predicate=lambda path=None, data=None, **kwds: \
-                USINT.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        slct[None]		= cpppo.decide(	'INT',	state=i16p,
-            predicate=lambda path=None, data=None, **kwds: \
-                INT.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        slct[None]		= cpppo.decide(	'UINT',	state=u16p,
-            predicate=lambda path=None, data=None, **kwds: \
-                UINT.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        slct[None]		= cpppo.decide(	'DINT',	state=i32p,
-            predicate=lambda path=None, data=None, **kwds: \
-                DINT.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        slct[None]		= cpppo.decide(	'UDINT',state=u32p,
-            predicate=lambda path=None, data=None, **kwds: \
-                UDINT.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        slct[None]		= cpppo.decide(	'REAL',	state=fltp,
-            predicate=lambda path=None, data=None, **kwds: \
-                REAL.tag_type == ( data[path+tag_type] if isinstance( tag_type, cpppo.type_str_base ) else tag_type ))
-        
         super( typed_data, self ).__init__( name=name, initial=slct, **kwds )
 
     @classmethod
@@ -1263,8 +1596,15 @@ class typed_data( cpppo.dfa ):
             tag_type		= data.get( 'type' )
         assert hasattr( data, '__iter__' ) and 'data' in data and tag_type in cls.TYPES_SUPPORTED, \
             "Unknown (or no) typed data found for tag_type %r: %r" % ( tag_type, data )
-        produce			= cls.TYPES_SUPPORTED[tag_type].produce
-        return b''.join( produce( v ) for v in data.data )
+        values			= data.data
+        fmt			= cls.TYPES_SUPPORTED[tag_type].struct_format.lstrip( '<' )
+        if ( isinstance( values, array.array ) and values.typecode == fmt and sys.byteorder == 'little'
+             and values.itemsize == cls.TYPES_SUPPORTED[tag_type].struct_calcsize ):
+            # Already in wire format (eg. from an ArrayAttribute)
+            return values.tostring() if sys.version_info[0] < 3 else values.tobytes()
+        if not isinstance( values, (list, tuple) ):
+            values		= list( values )
+        return struct.pack( '<%d%s' % ( len( values ), fmt ), *values )
 
     @classmethod
     def datasize( cls, tag_type, size=1 ):
@@ -440,7 +440,7 @@ def test_enip_header():
                         log.info( "%s chain: %r", machine.name_centered(), [origin.peek()] )
                         source.chain( [next( origin )] )
 
-            assert i == ( 54 if len( pkt ) else 1 )
+            assert i == ( 49 if len( pkt ) else 1 )
         if pkt:
             assert origin.peek() is not None
    
@@ -477,6 +477,262 @@ def test_enip_machine():
         if data:
             assert enip.enip_encode( data.enip ) == pkt, "Invalid data: %r" % data
 
+
+def test_enip_frame():
+    """The enip_frame fast path yields exactly what enip_machine does, consuming only complete
+    frames, and falling back to the state machine for partial frames."""
+    stream			= b''.join( pkt for pkt,tst in eip_tests )
+    source			= cpppo.buffering( stream )
+    for pkt,tst in eip_tests:
+        if not pkt:
+            continue
+        expect			= cpppo.dotdict()
+        with enip.enip_machine() as machine:
+            for m,s in machine.run( source=cpppo.chainable( pkt ), data=expect ):
+                pass
+        data			= cpppo.dotdict()
+        sent			= source.sent
+        assert enip.enip_frame( source, data, path='request' )
+        assert source.sent - sent == len( pkt )
+        assert data.request == expect, "%s != %s" % ( enip.enip_format( data ), enip.enip_format( expect ))
+        assert enip.enip_encode( data.request.enip ) == pkt
+        for k,v in tst.items():
+            assert data['request.'+k] == v
+    assert source.peek() is None
+    assert not enip.enip_frame( source, cpppo.dotdict() )
+
+    # Partial frames are not consumed; the state machine completes them, once more input arrives
+    pkt				= rss_004_request
+    for cut in range( len( pkt )):
+        source			= cpppo.buffering( pkt[:cut] )
+        data			= cpppo.dotdict()
+        assert not enip.enip_frame( source, data ) and not data and source.sent == 0
+        with enip.enip_machine() as machine:
+            for m,s in machine.run( source=source, data=data ):
+                if s is None and source.peek() is None:
+                    source.chain( pkt[cut:] )
+        assert enip.enip_encode( data.enip ) == pkt
+
+    # Not a buffering source; always falls back
+    assert not enip.enip_frame( cpppo.chainable( pkt ), cpppo.dotdict() )
+
+
+def test_enip_encode_buffers():
+    """The encapsulated payload is gathered into the message sent, without first being copied."""
+    for pkt,tst in eip_tests:
+        if not pkt:
+            continue
+        data			= cpppo.dotdict()
+        with enip.enip_machine() as machine:
+            for m,s in machine.run( source=cpppo.chainable( pkt ), data=data ):
+                pass
+        bufs			= enip.enip_encode_buffers( data.enip )
+        assert b''.join( bufs ) == enip.enip_encode( data.enip ) == pkt
+        assert len( bufs ) == ( 2 if data.enip.length else 1 )
+        if sys.version_info[0] >= 3 and data.enip.length:
+            assert bufs[1] is data.enip.input
+
+        lhs,rhs			= socket.socketpair()
+        try:
+            network.sendmsg( lhs, bufs )
+            lhs.shutdown( socket.SHUT_WR )
+            rcvd		= b''
+            while True:
+                msg		= rhs.recv( 1024 )
+                if not msg:
+                    break
+                rcvd	       += msg
+            assert rcvd == pkt
+        finally:
+            lhs.close()
+            rhs.close()
+
+
+def test_octets_fields():
+    """An octets_fields decodes all its fields at once, storing each just as its own state would."""
+    fields			= enip.octets_fields( 'fields', context='hdr', format='<H4sI',
+                                              fields=( 'command', 'name', 'size' ), terminal=True )
+    machine			= cpppo.dfa( 'fields', initial=fields, terminal=True )
+    source			= cpppo.buffering( b'\x01\x02abcd\x10\x00\x00\x00!' )
+    data			= cpppo.dotdict()
+    data['hdr.size']		= [ 1 ]		# An existing list target is appended to
+    with machine:
+        for m,s in machine.run( source=source, data=data ):
+            pass
+    assert machine.terminal and source.sent == 10
+    assert data.hdr.command == 0x0201
+    assert enip.octets_encode( data.hdr.name.input ) == b'abcd'	# A string field goes to <field>.input
+    assert data.hdr.size == [ 1, 16 ]
+    assert 'fields__' not in data.hdr		# The raw octets temporary is discarded
+    assert fields.keys_for( 'hdr' ) == ( 'hdr.command', 'hdr.name.input', 'hdr.size' )
+    assert fields.keys_for( 'hdr' ) is fields.keys_for( 'hdr' )
+
+    # A name is required for every field of the format
+    try:
+        enip.octets_fields( 'short', format='<HH', fields=( 'one', ))
+        assert False, "Should have failed on a missing field name"
+    except AssertionError:
+        pass
+
+def test_octets_bulk():
+    """An octets_bulk collects the same .input as an octets, whether or not the source can take slices."""
+    payload			= bytes(bytearray( range( 256 ))) * 3
+    for source in ( cpppo.chainable(), cpppo.buffering() ):
+        data			= cpppo.dotdict()
+        data.length		= len( payload ) - 1
+        machine			= cpppo.dfa( 'bulk', initial=enip.octets_bulk( 'payload', context='payload',
+                                                     repeat='..length', terminal=True ),
+                                   terminal=True )
+        waits			= 0
+        with machine:
+            for m,s in machine.run( source=source, data=data ):
+                if s is None and source.peek() is None:
+                    waits      += 1
+                    source.chain( payload[(waits-1)*100:waits*100] )
+        assert waits == 8
+        assert machine.terminal
+        assert enip.octets_encode( data.payload.input ) == payload[:-1]
+        assert source.peek() == payload[-1:][0]
+
+    # Fed in small pieces, the buffering source is extended in place; no view of it is retained
+    # across non-transitions, which would force it to copy its whole buffer on every chain
+    source			= cpppo.buffering()
+    buf				= source.buffer
+    data			= cpppo.dotdict( length=1000 )
+    with machine:
+        for m,s in machine.run( source=source, data=data ):
+            if s is None and source.peek() is None:
+                source.chain( payload[:10] )
+                assert source.buffer is buf, "buffering copied its buffer"
+    assert len( data.payload.input ) == 1000
+
+    # An enclosing limit stops the scan at the ending symbol, rather than over-reading
+    source			= cpppo.buffering( payload )
+    data			= cpppo.dotdict( length=100 )
+    limited			= cpppo.dfa( 'limited', initial=machine, terminal=True, limit=10 )
+    try:
+        with limited:
+            for m,s in limited.run( source=source, data=data ):
+                pass
+        assert False, "Should have failed on exceeding the limit"
+    except cpppo.NonTerminal:
+        pass
+    assert source.sent == 10 and len( data.payload.input ) == 10
+def test_typed_data():
+    """typed_data decodes (and produces) each run of available elements in bulk, however the input
+    arrives, appending to any existing .data."""
+    values			= {
+        enip.SINT.tag_type:	[ -128, -1, 0, 1, 127 ],
+        enip.USINT.tag_type:	[ 0, 1, 255 ],
+        enip.INT.tag_type:	[ -32768, -1, 0, 32767 ],
+        enip.UINT.tag_type:	[ 0, 1, 65535 ],
+        enip.DINT.tag_type:	list( range( -62, 63 )), # a 500-byte DINT read
+        enip.UDINT.tag_type:	[ 0, 1, 2**32-1 ],
+        enip.REAL.tag_type:	[ -1.5, 0.0, 0.25, 1.0e10 ],
+    }
+    for tag_type,vals in values.items():
+        raw			= enip.typed_data.produce( cpppo.dotdict( data=vals ), tag_type=tag_type )
+        assert raw == b''.join( enip.typed_data.TYPES_SUPPORTED[tag_type].produce( v ) for v in vals )
+        assert len( raw ) == enip.typed_data.datasize( tag_type, len( vals ))
+        for source in ( cpppo.chainable(), cpppo.buffering() ):
+            for step in ( 1, 3, len( raw )):
+                data		= cpppo.dotdict( {'typed.type': tag_type} )
+                machine		= cpppo.dfa( 'typed', initial=enip.typed_data( 'data', context='typed',
+                                                                               tag_type='.type', terminal=True ),
+                                             terminal=True, limit=len( raw ))
+                chunks		= [ raw[i:i+step] for i in range( 0, len( raw ), step ) ]
+                with machine:
+                    for m,s in machine.run( source=source, data=data ):
+                        if s is None and source.peek() is None and chunks:
+                            source.chain( chunks.pop( 0 ))
+                assert machine.terminal and not chunks
+                assert data.typed.data == vals
+
+    # A whole 500-byte DINT read available is decoded in one operation
+    events			= []
+    raw				= enip.typed_data.produce( cpppo.dotdict( data=values[enip.DINT.tag_type] ),
+                                                   tag_type=enip.DINT.tag_type )
+    data			= cpppo.dotdict( {'typed.data': [ 99 ]} )
+    machine			= cpppo.dfa( 'typed', initial=enip.typed_data( 'data', context='typed',
+                                                                   tag_type=enip.DINT.tag_type, terminal=True ),
+                                     terminal=True, limit=len( raw ))
+    cpppo.automata.tracing( lambda event, **kwds: events.append( ( event, kwds.get( 'value' ))))
+    try:
+        with machine:
+            for m,s in machine.run( source=cpppo.buffering( raw ), data=data ):
+                pass
+    finally:
+        cpppo.automata.tracing( None )
+    assert data.typed.data == [ 99 ] + values[enip.DINT.tag_type]
+    assert [ v for e,v in events if e == 'input' ] == [ 125 ]
+
+    # A partial element at the limit is rejected
+    machine			= cpppo.dfa( 'typed', initial=enip.typed_data( 'data', tag_type=enip.DINT.tag_type,
+                                                                   terminal=True ),
+                                     terminal=True, limit=6 )
+    try:
+        with machine:
+            for m,s in machine.run( source=cpppo.buffering( raw ), data=cpppo.dotdict() ):
+                pass
+        assert False, "Should have failed on a partial element"
+    except cpppo.NonTerminal:
+        pass
+
+
+def test_enip_machine_generate():
+    """The generated enip_machine parser must produce exactly the interpreted machine's results."""
+    with enip.enip_machine() as machine:
+        parser			= cpppo.generate( machine, name="enip_parse" )
+    for pkt,tst in eip_tests:
+        data			= cpppo.dotdict()
+        source			= cpppo.chainable( pkt )
+        with enip.enip_machine() as machine:
+            for m,s in machine.run( source=source, data=data ):
+                if s is None and source.peek() is None:
+                    break
+        fast			= cpppo.dotdict()
+        assert parser( pkt, fast ) == len( pkt )
+        assert fast == data, "Generated: %r\nInterpreted: %r" % ( fast, data )
+        if pkt:
+            try:
+                parser( pkt[:-1], cpppo.dotdict() )
+                assert False, "Should have failed on incomplete sentence"
+            except cpppo.NonTerminal:
+                pass
+
+    # A parsing context (using the generated parser) produces the same frames, fed in fragments
+    frames			= cpppo.parsing( enip.enip_machine() )
+    assert frames.parser is not None
+    stream			= b''.join( pkt for pkt,tst in eip_tests )
+    done			= []
+    for i in range( 0, len( stream ), 7 ):
+        done.extend( frames.feed( stream[i:i+7] ))
+    done.extend( frames.finish() )
+    assert [ enip.enip_encode( d.enip ) for d in done ] == [ pkt for pkt,tst in eip_tests if pkt ]
+
+    # ... no matter where the stream is split
+    expect			= [ pkt for pkt,tst in eip_tests if pkt ][:3]
+    stream			= b''.join( expect )
+    for i in range( len( stream ) + 1 ):
+        frames			= cpppo.parsing( enip.enip_machine() )
+        done			= frames.feed( stream[:i] ) + frames.feed( stream[i:] ) + frames.finish()
+        assert [ enip.enip_encode( d.enip ) for d in done ] == expect, "Split at %d" % i
+
+    # Unless the input is final, an empty sentence may yet continue
+    try:
+        parser( b'', cpppo.dotdict(), final=False )
+        assert False, "Should have awaited further input"
+    except cpppo.NonTerminal:
+        pass
+    assert parser( b'', cpppo.dotdict() ) == 0
+
+    # Machines with decisions cannot be generated
+    try:
+        cpppo.generate( enip.CPF() )
+        assert False, "Should not have generated a CPF parser"
+    except cpppo.NotGenerable:
+        pass
+
 extpath_1		= bytes(bytearray([
     0x01,						# 1 word
     0x28, 0x01,   					# 8-bit element segment == 1
@@ -683,6 +939,19 @@ def test_enip_EPATH():
         out			= cls.produce( data.request[cls.__name__] )
         assert out == prod, \
             "Invalid EPATH data: %r\nexpect: %r\nactual: %r" % ( data, prod, out )
+        assert cls.produce( data.request[cls.__name__] ) == out # (cached)
+
+    # The encoding of all but a final element segment is cached, and shared by each element
+    enip.EPATH.CACHE.clear()
+    for elm in ( 0, 1, 0x1234, 0x12345678 ):
+        path			= cpppo.dotdict( segment=[ cpppo.dotdict( symbolic='SCADA' ),
+                                                   cpppo.dotdict( element=elm ) ] )
+        out			= enip.EPATH.produce( path )
+        expect			= b'\x91\x05SCADA\x00' + enip.EPATH.produce_segment( path.segment[-1] )
+        assert out == enip.USINT.produce( len( expect ) // 2 ) + expect
+    assert len( enip.EPATH.CACHE ) == 1
+    assert enip.route_path.produce( path )[1:2] == b'\x00' # same cached segments, padded size
+    assert len( enip.EPATH.CACHE ) == 2
 
 
 commserv_1			= bytes(bytearray([
@@ -715,7 +984,7 @@ def test_enip_listservices():
             log.info( "%s #%3d -> %10.10s; next byte %3d: %-10.10r: %r", m.name_centered(),
                       i, s, source.sent, source.peek(), data )
         assert machine.terminal, "%s: Should have reached terminal state" % machine.name_centered()
-        assert i == 24
+        assert i == 23
     assert source.peek() is None
     assert 'communications_service' in data
     assert data.communications_service.version == 1
@@ -1471,6 +1740,33 @@ def test_enip_CIP():
             raise
 
 
+def test_enip_CIP_record():
+    """Parsing into a slotted enip_frame_record yields the same keys and values as a dotdict, and
+    reproduces the original frame."""
+    for pkt,tst in CIP_tests:
+        if not pkt:
+            continue
+        results			= []
+        for data in ( cpppo.dotdict(), enip.enip_frame_record() ):
+            with enip.enip_machine( context='enip' ) as machine:
+                for m,s in machine.run( source=cpppo.chainable( pkt ), data=data ):
+                    pass
+            with enip.CIP() as machine:
+                for m,s in machine.run( path='enip', source=cpppo.peekable( data.enip.get( 'input', b'' )), data=data ):
+                    pass
+            results.append( data )
+        data,rec		= results
+        assert isinstance( rec.enip, enip.enip_header_record )
+        assert sorted( rec.keys() ) == sorted( data.keys() )
+        assert rec == data, "record: %s\n!= dotdict: %s" % ( enip.enip_format( rec ), enip.enip_format( data ))
+        for k,v in tst.items():
+            if k in data:
+                assert rec[k] == v
+        if 'enip.CIP.send_data' in rec:
+            assert all( isinstance( item, enip.CPF_item_record ) for item in rec.enip.CIP.send_data.CPF.item )
+        assert enip.enip_encode( rec.enip ) == pkt
+
+
 def test_enip_device_symbolic():
     enip.device.symbol['SCADA'] = {'class':0x401, 'instance':1, 'attribute':2}
     path={'segment':[{'symbolic':'SCADA'}, {'element':4}]}
@@ -627,6 +627,43 @@ def logix_performance( repeat=1000 ):
     assert data.read_frag.data[-1] == 19
 
 
+def test_logix_array_attribute():
+    """An ArrayAttribute produces exactly the same encoding as an Attribute, with its values held in
+    an array.array of the wire format."""
+    import array
+    size			= 1000
+    for typ,default in ( ( enip.parser.DINT, [n * 65537 for n in range( size )] ),
+                             ( enip.parser.INT,  [n - size//2 for n in range( size )] ),
+                             ( enip.parser.REAL, [n / 4.0 for n in range( size )] )):
+        plain			= enip.device.Attribute( 'plain', typ, default=default )
+        fast			= enip.device.ArrayAttribute( 'fast', typ, default=default )
+        assert isinstance( fast.value, array.array )
+        assert len( fast ) == len( plain ) == size
+        assert list( fast[10:20] ) == plain[10:20]
+        assert fast[5] == plain[5]
+        assert fast.produce() == plain.produce()
+        assert fast.produce( 100, 225 ) == plain.produce( 100, 225 )
+
+        # A slice of an ArrayAttribute is produced by typed_data directly from its bytes
+        assert enip.parser.typed_data.produce( cpppo.dotdict( data=fast[0:125] ), tag_type=typ.tag_type )             == enip.parser.typed_data.produce( cpppo.dotdict( data=plain[0:125] ), tag_type=typ.tag_type )
+
+        # Slice writes are converted into the array's type, and must not change its length
+        fast[0:3]		= default[3:6]
+        plain[0:3]		= default[3:6]
+        assert fast.produce() == plain.produce()
+        try:
+            fast[0:3]		= default[0:2]
+            assert False, "Should have failed to resize ArrayAttribute"
+        except AssertionError as exc:
+            assert "Cannot assign" in str( exc )
+        assert len( fast ) == size
+
+    # Scalars are held just as for an Attribute
+    scalar			= enip.device.ArrayAttribute( 'scalar', enip.parser.REAL, default=1.5 )
+    assert scalar.value == 1.5
+    assert scalar.produce() == enip.device.Attribute( 'scalar', enip.parser.REAL, default=1.5 ).produce()
+
+
 # This number of repetitions is the point where the performance of pypy 2.1
 # intersects with cpython 2.7/3.3 on my platform (OS-X 10.8 on a 2.3GHz i7:
 # ~380TPS on a single thread.  Set thresholds low, for tests on slow hosts.
@@ -748,6 +785,14 @@ def logix_remote( count, svraddr, kwargs ):
     duration			= cpppo.timer() - start
     log.warning( "Client ReadFrg. Average %7.3f TPS (%7.3fs ea)." % ( count / duration, duration / count ))
 
+    # The reply is parsed into slotted records, down to the Read Tag Fragmented reply's data
+    assert isinstance( data, enip.enip_frame_record )
+    reply			= data.enip.CIP.send_data.CPF.item[1].unconnected_send.request
+    assert isinstance( reply, logix.tag_request_record )
+    assert isinstance( reply.read_frag, logix.read_frag_record )
+    assert reply.status == 0 and reply.read_frag.type == enip.INT.tag_type
+    assert list( reply.read_frag.data ) == [ 0 ]
+
     kwargs['server'].control.done= True # Signal the server to terminate
 
 
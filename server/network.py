@@ -82,6 +82,22 @@ def recv( conn, maxlen=1024 ):
     return msg
 
 
+def sendmsg( conn, buffers ):
+    """Send all of the supplied buffers (any bytes-like objects), gathered by socket.sendmsg where
+    available (Python3, on POSIX) instead of first being joined into a single copy; otherwise,
+    joined and sent via sendall.  Raises socket.error on failure."""
+    if not hasattr( conn, 'sendmsg' ):
+        conn.sendall( b''.join( buffers ))
+        return
+    views			= [ memoryview( buf ) for buf in buffers if len( buf ) ]
+    while views:
+        sent			= conn.sendmsg( views )
+        while views and sent >= views[0].nbytes:
+            sent	       -= views.pop( 0 ).nbytes
+        if sent:
+            views[0]		= views[0][sent:]
+
+
 @readable()
 def accept( conn ):
     return conn.accept()